@@ -0,0 +1,37 @@
+'''
+Memory used by one million sessions in the naive dict storage used by the tests and in
+MemorySessionStorage. Run from the repository root:
+
+    python -m benchmarks.session_memory [sessions]
+'''
+import gc
+import secrets
+import sys
+import tracemalloc
+
+from flask_authbp.memory import MemorySessionStorage
+from tests.utility import SbTestStorage
+
+
+def measure(storage, sessions, users):
+    gc.collect()
+    tracemalloc.start()
+    for i in range(sessions):
+        # like in a request, the session id and username are fresh strings on every login
+        sessionId = secrets.token_urlsafe()
+        username = f'User{i % users}'
+        storage.store_session(sessionId, username)
+        storage.add_user_session(username, sessionId)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+def main(sessions=1_000_000, users=100_000):
+    for name, storage_type in (('naive dicts', SbTestStorage), ('MemorySessionStorage', MemorySessionStorage)):
+        used = measure(storage_type(), sessions, users)
+        print(f'{name:<22} {used / 2 ** 20:8.1f} MiB  {used / sessions:6.1f} B/session')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,50 @@
+'''
+Token issuance and verification throughput and token size per codec, compared with the
+generic jwt.encode/jwt.decode calls _TokenGenerator used before. Run from the repository root:
+
+    python -m benchmarks.token_codecs [tokens]
+'''
+import datetime
+import sys
+import time
+import timeit
+
+import jwt
+
+from flask_authbp.codec import CODECS
+
+SECRET = 'my secret'
+UID = 'BenchmarkUser'
+
+
+def legacy_encode():
+    payload = {
+        'uid': UID,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(seconds=900),
+        'iat': datetime.datetime.utcnow()
+    }
+    return jwt.encode(payload, SECRET, algorithm='HS256')
+
+
+def legacy_decode(token):
+    return jwt.decode(token, SECRET, algorithms=['HS256'])['uid']
+
+
+def report(name, encode, decode, number):
+    token = encode()
+    issued = number / timeit.timeit(encode, number=number)
+    verified = number / timeit.timeit(lambda: decode(token), number=number)
+    print(f'{name:<12} {issued:>12,.0f} {verified:>12,.0f} {len(token):>8}')
+
+
+def main(number=50000):
+    print(f'{"codec":<12} {"issue/s":>12} {"verify/s":>12} {"bytes":>8}')
+    report('legacy jwt', legacy_encode, legacy_decode, number)
+    for name, codecType in CODECS.items():
+        codec = codecType(SECRET)
+        now = int(time.time())
+        report(name, lambda: codec.encode(UID, now, now + 900), codec.decode, number)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -1,33 +1,68 @@
 from http import HTTPStatus
-from flask import Blueprint, abort, redirect, request  # type: ignore
+from flask import Blueprint, Response, abort, current_app, redirect, request, stream_with_context  # type: ignore
 from flask_restx import Namespace, Api, Resource, fields  # type: ignore
-from werkzeug.security import generate_password_hash, check_password_hash  # type: ignore
+from itsdangerous import BadSignature
 
-from typing import Tuple
-import re
+from typing import Callable, Optional, Tuple
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import threading
 
+from flask_authbp import audit as auditlog
+from flask_authbp.bloom import UsernameFilter
+from flask_authbp.cli import add_commands, add_import_users_command, add_username_filter_command
+from flask_authbp.hashing import HashingPolicy
 from flask_authbp.messages import LoginStatus, RegistrationStatus
 from flask_authbp.types import Authentication
+from flask_authbp.validation import credentials_within_limits, name_valid, pass_valid, read_credentials
 
 
-def name_valid(username):
-    '''
-    4-16 symbols, can contain A-Z, a-z, 0-9, _ (_ can not be at the begin/end and can not go in a row (__))
-    '''
-    return re.search(
-        r'^(?![_])(?!.*[_]{2})[a-zA-Z0-9._]+(?<![_])$',
-        username
-    )
+MAX_PAGE_SIZE = 1000
+
+
+class _Flight:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
 
 
-def pass_valid(password):
+class SingleFlight:
     '''
-    6-64 symbols, required upper and lower case letters. Can contain !@#$%_  .
+    Wraps a single argument lookup so concurrent calls with the same argument share one
+    call and its result instead of all hitting the storage.
     '''
-    return re.search(
-        r'^(?=.*[\d])(?=.*[A-Z])(?=.*[a-z])[\w\d!@#$%_]{6,64}$',
-        password
-    )
+    def __init__(self, lookup) -> None:
+        self._lookup = lookup
+        self._flights: dict = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, key):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = self._lookup(key)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key)
+            flight.done.set()
 
 
 def only_name():
@@ -43,24 +78,37 @@ def name_and_pass():
     }
 
 
-def authentication_blueprint(authentication: Authentication) -> Tuple[Blueprint, Namespace]:
-    bp = Blueprint('auth', __name__, url_prefix='/')
+def authentication_blueprint(authentication: Authentication, hashingPolicy: Optional[HashingPolicy] = None,
+                             usernameFilter: Optional[UsernameFilter] = None,
+                             audit: Optional[Callable] = None) -> Tuple[Blueprint, Namespace]:
+    if usernameFilter is not None and authentication.iter_usernames is None:
+        raise TypeError('A usernameFilter requires a storage that implements iter_usernames')
+    hashingPolicy = hashingPolicy or HashingPolicy()
+    bp = Blueprint('auth', __name__, url_prefix='/', cli_group='authbp')
     api = Api(bp)
     ns = Namespace('auth', 'Authentication', path='/')
     api.add_namespace(ns)
-    add_register_route(ns, authentication.find_password_hash, authentication.store_user)
-    add_login_route(ns, authentication.find_password_hash, authentication.generate_session_info)
+    add_register_route(
+        ns, authentication.find_password_hash, authentication.store_user, hashingPolicy, usernameFilter, audit
+    )
+    add_login_route(
+        ns, authentication.find_password_hash, authentication.generate_session_info,
+        hashingPolicy, authentication.update_password_hash, usernameFilter, audit, authentication.iter_usernames
+    )
+    add_commands(bp)
+    add_import_users_command(bp, authentication.store_users, hashingPolicy)
+    if usernameFilter is not None:
+        add_username_filter_command(bp, usernameFilter, authentication.iter_usernames)
     return bp, ns
 
 
-def add_register_route(ns, user_exists, store_user):
+def add_register_route(ns, user_exists, store_user, hashingPolicy, usernameFilter=None, audit=None):
     @ns.route('/register')
     class Register(Resource):
-        @ns.expect(ns.model('UserLogin', name_and_pass()), validate=True)
+        @ns.expect(ns.model('UserLogin', name_and_pass()))
         @ns.response(HTTPStatus.OK, 'Success')
         def post(self):
-            username = ns.payload['username']
-            password = ns.payload['password']
+            username, password = read_credentials()
             if not name_valid(username):
                 ns.abort(HTTPStatus.BAD_REQUEST, RegistrationStatus.InvalidUsername)
 
@@ -70,30 +118,165 @@ def add_register_route(ns, user_exists, store_user):
             if user_exists(username):
                 ns.abort(HTTPStatus.BAD_REQUEST, RegistrationStatus.UserExists)
 
-            store_user(username, generate_password_hash(password))
+            if store_user(username, hashingPolicy.hash(password)) is False:
+                ns.abort(HTTPStatus.BAD_REQUEST, RegistrationStatus.UserExists)
+            if usernameFilter is not None:
+                usernameFilter.add(username)
+            auditlog.record(audit, auditlog.REGISTER, username)
+
+
+def add_login_route(ns, find_password_hash, generate_session_info, hashingPolicy, update_password_hash=None,
+                    usernameFilter=None, audit=None, iter_usernames=None):
+    find_password_hash = SingleFlight(find_password_hash)
 
+    def reject(username):
+        auditlog.record(audit, auditlog.LOGIN_FAILED, username)
+        ns.abort(HTTPStatus.UNAUTHORIZED, LoginStatus.WrongUsernameOrPassword)
 
-def add_login_route(ns, find_password_hash, generate_session_info):
     @ns.route('/login')
     class Login(Resource):
         @ns.expect(ns.model('UserLogin', name_and_pass()))
         @ns.response(200, 'Success')
         @ns.response(401, LoginStatus.WrongUsernameOrPassword)
         def post(self):
-            username = ns.payload['username']
+            username, password = read_credentials()
+            if not credentials_within_limits(username, password):
+                reject(username)
+            known = True
+            if usernameFilter is not None:
+                usernameFilter.build(iter_usernames)
+                known = username in usernameFilter
+                if not known and not usernameFilter.allow_miss_lookup():
+                    reject(username)
             passwordHash = find_password_hash(username)
 
             if not passwordHash:
-                ns.abort(HTTPStatus.UNAUTHORIZED, LoginStatus.WrongUsernameOrPassword)
+                reject(username)
+            if not known:
+                usernameFilter.add(username)
 
-            if check_password_hash(passwordHash, ns.payload['password']):
+            if hashingPolicy.verify(passwordHash, password):
+                if update_password_hash and hashingPolicy.needs_rehash(passwordHash):
+                    update_password_hash(username, hashingPolicy.hash(password))
                 response = generate_session_info(username)
+                auditlog.record(audit, auditlog.LOGIN, username)
                 if response:
                     return response
                 else:
                     return HTTPStatus.OK
             else:
-                ns.abort(HTTPStatus.UNAUTHORIZED, LoginStatus.WrongUsernameOrPassword)
+                reject(username)
+
+
+def _listing_page(iterate, cursor, limit):
+    after = _cursors().loads(cursor) if cursor else None
+    items, lastKey, nextCursor = [], None, None
+    for key, item in iterate(after):
+        if len(items) == limit:
+            nextCursor = _cursors().dumps(lastKey)
+            break
+        items.append(item)
+        lastKey = key
+    return {'items': items, 'next_cursor': nextCursor}
+
+
+class _Cursors:
+    '''
+    Opaque listing cursors. The key is encrypted with an HMAC-SHA256 keystream seeded by a
+    synthetic IV, the truncated HMAC of the key, which also authenticates it on the way back.
+    Cursors end up in URLs and logs, so they must not reveal keys such as session ids.
+    '''
+    _ivSize = 16
+
+    def __init__(self, secret: str) -> None:
+        self._macKey = hmac.new(secret.encode(), b'flask_authbp.admin.cursor.mac', hashlib.sha256).digest()
+        self._streamKey = hmac.new(secret.encode(), b'flask_authbp.admin.cursor.stream', hashlib.sha256).digest()
+
+    def _xor(self, iv, data):
+        stream = b''.join(
+            hmac.new(self._streamKey, iv + counter.to_bytes(4, 'big'), hashlib.sha256).digest()
+            for counter in range((len(data) + 31) // 32)
+        )
+        return bytes(a ^ b for a, b in zip(data, stream))
+
+    def _iv(self, plaintext):
+        return hmac.new(self._macKey, plaintext, hashlib.sha256).digest()[:self._ivSize]
+
+    def dumps(self, key) -> str:
+        plaintext = json.dumps(key).encode()
+        iv = self._iv(plaintext)
+        return base64.urlsafe_b64encode(iv + self._xor(iv, plaintext)).rstrip(b'=').decode()
+
+    def loads(self, cursor: str):
+        try:
+            data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        except (binascii.Error, ValueError):
+            raise BadSignature('Invalid cursor')
+        iv = data[:self._ivSize]
+        plaintext = self._xor(iv, data[self._ivSize:])
+        if len(iv) != self._ivSize or not hmac.compare_digest(iv, self._iv(plaintext)):
+            raise BadSignature('Invalid cursor')
+        return json.loads(plaintext)
+
+
+def _cursors():
+    return _Cursors(current_app.config['SECRET_KEY'])
+
+
+def user_listing(iter_usernames):
+    def iterate(after):
+        for username in iter_usernames(after):
+            yield username, {'username': username}
+    return iterate
+
+
+def add_admin_routes(ns, permission_required, is_admin, listings):
+    '''
+    Adds admin listings at /admin/<name> with keyset pagination and at /admin/<name>.jsonl
+    streamed as JSON lines. listings maps a name to a function that takes the last key
+    seen (or None) and yields (key, item) pairs in a stable key order.
+    '''
+    for name, iterate in listings.items():
+        add_admin_listing_routes(ns, permission_required, is_admin, name, iterate)
+
+
+def add_admin_listing_routes(ns, permission_required, is_admin, name, iterate):
+    parser = ns.parser()
+    parser.add_argument('cursor', type=str, location='args')
+    parser.add_argument('limit', type=int, default=100, location='args')
+
+    def require_admin(user):
+        if not is_admin(user):
+            ns.abort(HTTPStatus.FORBIDDEN, 'Admin required')
+
+    @ns.route(f'/admin/{name}', endpoint=f'admin_{name}')
+    class Listing(Resource):
+        method_decorators = [permission_required]
+
+        @ns.expect(parser)
+        @ns.response(HTTPStatus.OK, 'Success')
+        @ns.response(HTTPStatus.FORBIDDEN, 'Admin required')
+        def get(self, user):
+            require_admin(user)
+            arguments = parser.parse_args()
+            try:
+                return _listing_page(iterate, arguments['cursor'], min(max(arguments['limit'], 1), MAX_PAGE_SIZE))
+            except BadSignature:
+                ns.abort(HTTPStatus.BAD_REQUEST, 'Invalid cursor')
+
+    @ns.route(f'/admin/{name}.jsonl', endpoint=f'admin_{name}_jsonl')
+    class Export(Resource):
+        method_decorators = [permission_required]
+
+        @ns.response(HTTPStatus.OK, 'Success')
+        @ns.response(HTTPStatus.FORBIDDEN, 'Admin required')
+        def get(self, user):
+            require_admin(user)
+
+            def lines():
+                for _, item in iterate(None):
+                    yield json.dumps(item) + '\n'
+            return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
 
 
 class PermissionDecorator:
@@ -0,0 +1,174 @@
+from collections import deque
+from typing import Callable, List, NamedTuple, Optional
+from flask import has_request_context, request
+
+import atexit
+import json
+import threading
+import time
+
+
+LOGIN = 'login'
+LOGIN_FAILED = 'login_failed'
+REGISTER = 'register'
+LOGOUT = 'logout'
+LOGOUT_ALL = 'logout_all'
+
+
+class AuditEvent(NamedTuple):
+    kind: str
+    username: Optional[str]
+    timestamp: float
+    remoteAddr: Optional[str]
+
+    @classmethod
+    def now(cls, kind, username):
+        return cls(kind, username, time.time(), request.remote_addr if has_request_context() else None)
+
+
+def record(audit: Optional[Callable[[AuditEvent], None]], kind: str, username: Optional[str]) -> None:
+    if audit is not None:
+        audit(AuditEvent.now(kind, username))
+
+
+class FileSink:
+    '''
+    Appends events to a file as JSON lines
+    '''
+    def __init__(self, path: str) -> None:
+        self._path = path
+
+    def __call__(self, events: List[AuditEvent]) -> None:
+        with open(self._path, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(event._asdict()) + '\n' for event in events)
+
+
+class SqlSink:
+    '''
+    Inserts events with a single executemany per batch through a DB-API connection factory
+    '''
+    def __init__(self, connect: Callable, table: str = 'auth_audit', placeholder: str = '?') -> None:
+        self._connect = connect
+        placeholders = ', '.join([placeholder] * len(AuditEvent._fields))
+        self._insert = f'INSERT INTO {table} ({", ".join(AuditEvent._fields)}) VALUES ({placeholders})'
+
+    def __call__(self, events: List[AuditEvent]) -> None:
+        connection = self._connect()
+        try:
+            connection.cursor().executemany(self._insert, [tuple(event) for event in events])
+            connection.commit()
+        finally:
+            connection.close()
+
+
+class AuditLog:
+    '''
+    Queues audit events in memory and writes them to the sink in batches from a background
+    thread, either when batchSize events are queued or every flushInterval seconds.
+
+    When the queue is full, overflow decides what happens to a new event: 'drop_new' drops it,
+    'drop_oldest' drops the oldest queued event and 'block' waits up to blockTimeout seconds
+    for room before dropping it.
+    '''
+    def __init__(self, sink: Callable[[List[AuditEvent]], None], maxQueueSize: int = 10000,
+                 batchSize: int = 100, flushInterval: float = 1.0, overflow: str = 'drop_new',
+                 blockTimeout: float = 1.0) -> None:
+        if overflow not in ('drop_new', 'drop_oldest', 'block'):
+            raise ValueError(f'Unknown overflow policy {overflow}')
+        self._sink = sink
+        self._maxQueueSize = maxQueueSize
+        self._batchSize = batchSize
+        self._flushInterval = flushInterval
+        self._overflow = overflow
+        self._blockTimeout = blockTimeout
+        self._queue: deque = deque()
+        self._condition = threading.Condition()
+        self._writeLock = threading.Lock()
+        self._closed = False
+        self._stats = dict.fromkeys(('emitted', 'written', 'dropped', 'failedBatches'), 0)
+        self._worker = threading.Thread(target=self._run, name='flask_authbp-audit', daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def __call__(self, event: AuditEvent) -> None:
+        self.emit(event)
+
+    def emit(self, event: AuditEvent) -> bool:
+        '''
+        Queues the event, returns False if it was dropped
+        '''
+        with self._condition:
+            self._stats['emitted'] += 1
+            if self._closed:
+                self._stats['dropped'] += 1
+                return False
+            if len(self._queue) >= self._maxQueueSize:
+                if self._overflow == 'drop_oldest':
+                    self._queue.popleft()
+                    self._stats['dropped'] += 1
+                elif self._overflow == 'drop_new' or not self._condition.wait_for(
+                        lambda: len(self._queue) < self._maxQueueSize, self._blockTimeout):
+                    self._stats['dropped'] += 1
+                    return False
+            self._queue.append(event)
+            if len(self._queue) >= self._batchSize:
+                self._condition.notify_all()
+            return True
+
+    def _take(self, limit):
+        batch = [self._queue.popleft() for _ in range(min(limit, len(self._queue)))]
+        self._condition.notify_all()
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            self._sink(batch)
+            written, failed = len(batch), 0
+        except Exception:
+            written, failed = 0, 1
+        with self._condition:
+            self._stats['written'] += written
+            self._stats['failedBatches'] += failed
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: len(self._queue) >= self._batchSize or self._closed, self._flushInterval
+                )
+                if self._closed:
+                    return
+            with self._writeLock:
+                with self._condition:
+                    batch = self._take(self._batchSize)
+                self._write(batch)
+
+    def flush(self) -> None:
+        '''
+        Writes all queued events before returning
+        '''
+        with self._writeLock:
+            while True:
+                with self._condition:
+                    batch = self._take(self._batchSize)
+                if not batch:
+                    return
+                self._write(batch)
+
+    def close(self) -> None:
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+        self.flush()
+        atexit.unregister(self.close)
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self._stats)
+            stats['queued'] = len(self._queue)
+        return stats
@@ -0,0 +1,103 @@
+from typing import Callable, Iterable
+
+import hashlib
+import math
+import threading
+import time
+
+
+class UsernameFilter:
+    '''
+    Bloom filter of registered usernames, so logins with unknown usernames can skip the
+    storage lookup.
+
+    The filter only sees users registered through this process. Users added elsewhere, by
+    another worker or by import-users, are still looked up in the storage on a miss, up to
+    missLookupRate lookups per second with bursts of missLookupBurst, and added once found.
+    '''
+    def __init__(self, capacity: int = 1_000_000, falsePositiveRate: float = 0.01,
+                 missLookupRate: float = 10.0, missLookupBurst: int = 50) -> None:
+        if capacity <= 0 or not 0 < falsePositiveRate < 1:
+            raise ValueError('capacity must be positive and falsePositiveRate between 0 and 1')
+        self.capacity = capacity
+        self.falsePositiveRate = falsePositiveRate
+        self.bits = max(int(math.ceil(-capacity * math.log(falsePositiveRate) / math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.bits / capacity * math.log(2))), 1)
+        self.count = 0
+        self.missLookupRate = missLookupRate
+        self.missLookupBurst = missLookupBurst
+        self._missTokens = float(missLookupBurst)
+        self._missRefilledAt = time.monotonic()
+        self._array = bytearray((self.bits + 7) // 8)
+        self._lock = threading.Lock()
+        self._built = False
+        self._buildLock = threading.Lock()
+
+    def _positions(self, username):
+        digest = hashlib.blake2b(username.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, username: str) -> None:
+        positions = self._positions(username)
+        with self._lock:
+            for position in positions:
+                self._array[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def update(self, usernames: Iterable[str]) -> None:
+        for username in usernames:
+            self.add(username)
+
+    def build(self, usernames: Callable[[], Iterable[str]]) -> None:
+        '''
+        Adds the usernames on the first call only, so the storage is first read when the
+        filter is first needed rather than when the app is created
+        '''
+        if self._built:
+            return
+        with self._buildLock:
+            if not self._built:
+                self.update(usernames())
+                self._built = True
+
+    def allow_miss_lookup(self) -> bool:
+        '''
+        True if a username missing from the filter may still be looked up in the storage
+        '''
+        with self._lock:
+            now = time.monotonic()
+            self._missTokens = min(
+                self._missTokens + (now - self._missRefilledAt) * self.missLookupRate, self.missLookupBurst
+            )
+            self._missRefilledAt = now
+            if self._missTokens < 1:
+                return False
+            self._missTokens -= 1
+            return True
+
+    def __contains__(self, username: str) -> bool:
+        array = self._array
+        return all(array[position >> 3] & (1 << (position & 7)) for position in self._positions(username))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._array)
+
+    def estimated_false_positive_rate(self) -> float:
+        '''
+        False positive rate expected for the number of usernames added so far
+        '''
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def stats(self):
+        return {
+            'capacity': self.capacity,
+            'count': self.count,
+            'bits': self.bits,
+            'hashes': self.hashes,
+            'memoryBytes': self.memory_bytes,
+            'falsePositiveRate': self.falsePositiveRate,
+            'estimatedFalsePositiveRate': self.estimated_false_positive_rate(),
+        }
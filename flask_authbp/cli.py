@@ -0,0 +1,92 @@
+import click
+import time
+
+from flask_authbp.hashing import HashingPolicy, calibrate
+from flask_authbp.importing import import_users
+from flask_authbp.loadtest import run_loadtest
+
+
+@click.command('loadtest')
+@click.argument('url')
+@click.option('--users', default=10, show_default=True, help='Number of users seeded through /register.')
+@click.option('--requests', 'requestsPerUser', default=10, show_default=True, help='Requests per user after login.')
+@click.option('--login-ratio', 'loginRatio', default=0.1, show_default=True,
+              help='Fraction of requests that are logins, the rest hit the protected resource.')
+@click.option('--workers', default=8, show_default=True, help='Size of the worker pool.')
+@click.option('--processes', is_flag=True, help='Use a process pool instead of a thread pool.')
+@click.option('--resource', default='/testing/resource', show_default=True, help='Protected resource path.')
+@click.option('--method', default='POST', show_default=True, help='HTTP method for the protected resource.')
+@click.option('--insecure', is_flag=True, help='Skip TLS certificate verification, e.g. for self signed certificates.')
+@click.option('--timeout', default=10.0, show_default=True, help='Per request timeout in seconds.')
+@click.option('--seed', type=int, default=None, help='Random seed for the request mix.')
+def loadtest_command(url, **kwargs):
+    '''
+    Load test the authentication routes of a server running at URL
+    '''
+    report = run_loadtest(url, **kwargs)
+    click.echo(f'requests:   {report.requests}')
+    click.echo(f'duration:   {report.seconds:.2f} s')
+    click.echo(f'throughput: {report.throughput:.1f} req/s')
+    click.echo(f'errors:     {report.errors} ({report.error_rate:.2%})')
+    for kind in sorted(report.latencies):
+        percentiles = ', '.join(
+            f'p{p}={report.percentile(kind, p) * 1000:.1f} ms' for p in (50, 90, 99)
+        )
+        click.echo(f'{kind:<10}  n={len(report.latencies[kind])}, {percentiles}')
+    for failure, count in sorted(report.failures.items()):
+        click.echo(f'failed {failure}: {count}')
+
+
+@click.command('calibrate-hash')
+@click.option('--scheme', type=click.Choice(['pbkdf2', 'scrypt', 'argon2']), default='pbkdf2', show_default=True)
+@click.option('--target-ms', 'targetMs', default=250.0, show_default=True, help='Target time per hash in milliseconds.')
+def calibrate_hash_command(scheme, targetMs):
+    '''
+    Find the password hashing cost that takes about --target-ms on this machine
+    '''
+    method = calibrate(scheme, targetMs / 1000)
+    policy = HashingPolicy(method)
+    start = time.perf_counter()
+    policy.hash('Calibrate1234!')
+    click.echo(f'{method}  ({(time.perf_counter() - start) * 1000:.0f} ms per hash)')
+    click.echo(f'Use it with hashingPolicy=HashingPolicy({method!r})')
+
+
+def add_import_users_command(bp, store_users, hashingPolicy):
+    @bp.cli.command('import-users')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fileFormat', type=click.Choice(['csv', 'jsonl']),
+                  help='Input format, guessed from the file extension by default.')
+    @click.option('--workers', type=int, default=None, help='Hashing processes, 0 hashes in this process.')
+    @click.option('--batch-size', 'batchSize', default=1000, show_default=True, help='Users stored per storage call.')
+    @click.option('--checkpoint', type=click.Path(dir_okay=False),
+                  help='Progress file, an interrupted import continues where it stopped.')
+    def import_users_command(path, fileFormat, workers, batchSize, checkpoint):
+        '''
+        Import users from a CSV or JSON lines file with username and password or password_hash
+        '''
+        report = import_users(
+            path, store_users, hashingPolicy, fileFormat, workers, batchSize, checkpoint,
+            progress=lambda report: click.echo(
+                f'read {report.read}, imported {report.imported}, '
+                f'existing {report.existing}, invalid {report.invalid}', err=True
+            ),
+            rejected=lambda record, reason: click.echo(f'line {record.line}: {reason}', err=True)
+        )
+        click.echo(f'Imported {report.imported} of {report.read} users')
+
+
+def add_username_filter_command(bp, usernameFilter, iter_usernames):
+    @bp.cli.command('username-filter')
+    def username_filter_command():
+        '''
+        Show the size and false positive rate of the username filter
+        '''
+        usernameFilter.build(iter_usernames)
+        for key, value in usernameFilter.stats().items():
+            click.echo(f'{key}: {value}')
+
+
+def add_commands(bp):
+    bp.cli.add_command(loadtest_command)
+    bp.cli.add_command(calibrate_hash_command)
@@ -21,7 +21,7 @@ db.init_app(app)
 
 class ExampleUser(UserMixin, db.Model):
     username = db.Column(db.String(100), unique=True, primary_key=True)
-    passwordHash = db.Column(db.String(100))
+    passwordHash = db.Column(db.String(256))
 
     def __init__(self, username, passwordHash):
         self.username = username
@@ -47,6 +47,17 @@ class FlaskLoginTestStorage(Storage):
             db.session.commit()
             return True
 
+    def update_password_hash(self, username, passwordHash):
+        ExampleUser.query.get(username).passwordHash = passwordHash
+        db.session.commit()
+
+    def iter_usernames(self, after=None):
+        query = db.session.query(ExampleUser.username).order_by(ExampleUser.username)
+        if after is not None:
+            query = query.filter(ExampleUser.username > after)
+        for (username,) in query.yield_per(1000):
+            yield username
+
     def load_user(self, username) -> Type[UserMixin]:
         return ExampleUser.query.get(username)
 
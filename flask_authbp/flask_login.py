@@ -1,40 +1,50 @@
 from http import HTTPStatus
-from typing import Callable, Tuple, Type
+from typing import Callable, Optional, Tuple, Type
 from flask import Blueprint, Flask, abort, redirect, request, session
 from flask_login import LoginManager, UserMixin, current_user, login_required, login_user, logout_user  # type: ignore
 from flask_restx import Resource  # type: ignore
 
-from abc import ABC, abstractmethod
+from abc import abstractmethod
 
-from ._utility import authentication_blueprint, PermissionDecorator
-from .types import Authentication
+from . import audit as auditlog
+from ._utility import authentication_blueprint, add_admin_routes, user_listing, PermissionDecorator, SingleFlight
+from .bloom import UsernameFilter
+from .hashing import HashingPolicy
+from .types import Authentication, UserStorage, implemented
 
 
-class Storage(ABC):
-    @abstractmethod
-    def store_user(self, username: str, passwordHash: str) -> None:
-        ...
-
-    @abstractmethod
-    def find_password_hash(self, username):
-        ...
+class Storage(UserStorage):
+    # Set to True if load_user returns objects that any thread may use, e.g. not bound to
+    # a thread local database session, to let concurrent loads of the same user share one call
+    threadSafeUsers = False
 
     @abstractmethod
     def load_user(self, username) -> Type[UserMixin]:
         ...
 
 
-def add_authbp(app: Flask, storage: Storage) -> Callable:
+def add_authbp(app: Flask, storage: Storage, hashingPolicy: Optional[HashingPolicy] = None,
+               usernameFilter: Optional[UsernameFilter] = None, audit: Optional[Callable] = None,
+               isAdmin: Optional[Callable] = None) -> Callable:
     login_manager = LoginManager()
     login_manager.login_view = 'auth.login'
     login_manager.init_app(app)
-    login_manager.user_loader(storage.load_user)
+    login_manager.user_loader(SingleFlight(storage.load_user) if storage.threadSafeUsers else storage.load_user)
     bp, ns = authentication_blueprint(
-        Authentication(storage.find_password_hash, storage.store_user, _SessionGenerator(storage))
+        Authentication(
+            storage.find_password_hash, storage.store_user, _SessionGenerator(storage),
+            implemented(storage, 'update_password_hash'), implemented(storage, 'iter_usernames'),
+            storage.store_users
+        ),
+        hashingPolicy, usernameFilter, audit
     )
-    add_logout_route(ns)
+    add_logout_route(ns, audit)
+    permission_required = PermissionDecorator(lambda: None if current_user.is_anonymous else current_user)
+    if isAdmin:
+        listings = {'users': user_listing(storage.iter_usernames)} if implemented(storage, 'iter_usernames') else {}
+        add_admin_routes(ns, permission_required, isAdmin, listings)
     app.register_blueprint(bp)
-    return PermissionDecorator(lambda: None if current_user.is_anonymous else current_user)
+    return permission_required
 
 
 class _SessionGenerator:
@@ -45,7 +55,7 @@ class _SessionGenerator:
         login_user(self._storage.load_user(username))
 
 
-def add_logout_route(ns):
+def add_logout_route(ns, audit=None):
     @ns.route('/logout')
     class Logout(Resource):
         @ns.response(HTTPStatus.OK, 'Success')
@@ -53,5 +63,7 @@ def add_logout_route(ns):
         @ns.response(HTTPStatus.MOVED_PERMANENTLY, 'Insecure connection')
         @login_required
         def post(self):
+            username = current_user.get_id()
             logout_user()
+            auditlog.record(audit, auditlog.LOGOUT, username)
             return HTTPStatus.OK
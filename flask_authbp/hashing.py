@@ -0,0 +1,174 @@
+from werkzeug.security import check_password_hash, gen_salt, generate_password_hash  # type: ignore
+
+import hashlib
+import hmac
+import time
+
+try:
+    import argon2  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    argon2 = None
+
+
+DEFAULT_METHOD = 'pbkdf2:sha256:260000'
+
+
+def _require_argon2():
+    if argon2 is None:
+        raise ImportError('argon2 hashing requires the argon2-cffi package')
+    return argon2
+
+
+def _scrypt_params(method):
+    _, n, r, p = method.split(':')
+    return int(n), int(r), int(p)
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(
+        password.encode(), salt=salt.encode(), n=n, r=r, p=p, maxmem=132 * n * r * p, dklen=64
+    ).hex()
+
+
+def _werkzeug_method(method):
+    '''
+    The method prefix werkzeug writes into the hash, which includes the default iteration
+    count when the method leaves it out
+    '''
+    if method.startswith('pbkdf2:') and method.count(':') == 1:
+        return generate_password_hash('', method, 1).split('$', 1)[0]
+    return method
+
+
+def _argon2_hasher(method):
+    parts = method.split(':')
+    if len(parts) == 1:
+        return _require_argon2().PasswordHasher()
+    timeCost, memoryCost, parallelism = (int(part) for part in parts[1:])
+    return _require_argon2().PasswordHasher(
+        time_cost=timeCost, memory_cost=memoryCost, parallelism=parallelism
+    )
+
+
+def _werkzeug_digest(method):
+    if method.startswith('pbkdf2:'):
+        parts = method.split(':')
+        if len(parts) > 3 or (len(parts) == 3 and not parts[2].isdigit()):
+            return None
+        method = parts[1]
+    return method if method in hashlib.algorithms_available else None
+
+
+def recognized(passwordHash: str) -> bool:
+    '''
+    True if HashingPolicy.verify can check passwords against the hash: a salted werkzeug
+    ``method$salt$hash``, ``scrypt:<n>:<r>:<p>$salt$hash`` or an argon2 hash
+    '''
+    if passwordHash.startswith('$argon2'):
+        return argon2 is not None
+    parts = passwordHash.split('$')
+    if len(parts) != 3 or not all(parts):
+        return False
+    method, _, hashValue = parts
+    try:
+        bytes.fromhex(hashValue)
+    except ValueError:
+        return False
+    if method.startswith('scrypt:'):
+        try:
+            _scrypt_params(method)
+        except ValueError:
+            return False
+        return True
+    return _werkzeug_digest(method) is not None
+
+
+class HashingPolicy:
+    '''
+    Password hashing method and cost, written the way werkzeug writes them:
+
+    * ``pbkdf2:<hash>:<iterations>``, e.g. ``pbkdf2:sha256:600000``
+    * ``scrypt:<n>:<r>:<p>``, e.g. ``scrypt:32768:8:1``
+    * ``argon2`` or ``argon2:<time cost>:<memory cost KiB>:<parallelism>`` (requires argon2-cffi)
+    '''
+    def __init__(self, method: str = DEFAULT_METHOD, saltLength: int = 16) -> None:
+        self.saltLength = saltLength
+        if method.startswith('scrypt'):
+            self._scryptParams = _scrypt_params(method)
+        elif method.startswith('argon2'):
+            self._argon2 = _argon2_hasher(method)
+        else:
+            method = _werkzeug_method(method)
+        self.method = method
+
+    def __repr__(self):
+        return f'HashingPolicy({self.method!r})'
+
+    def hash(self, password: str) -> str:
+        if self.method.startswith('scrypt'):
+            salt = gen_salt(self.saltLength)
+            return f'{self.method}${salt}${_scrypt(password, salt, *self._scryptParams)}'
+        if self.method.startswith('argon2'):
+            return self._argon2.hash(password)
+        return generate_password_hash(password, self.method, self.saltLength)
+
+    def verify(self, passwordHash: str, password: str) -> bool:
+        if passwordHash.startswith('$argon2'):
+            _require_argon2()
+            try:
+                return argon2.PasswordHasher().verify(passwordHash, password)
+            except (argon2.exceptions.VerificationError, argon2.exceptions.InvalidHash):
+                return False
+        if passwordHash.startswith('scrypt:'):
+            try:
+                method, salt, hashValue = passwordHash.split('$', 2)
+                return hmac.compare_digest(_scrypt(password, salt, *_scrypt_params(method)), hashValue)
+            except ValueError:
+                return False
+        return check_password_hash(passwordHash, password)
+
+    def needs_rehash(self, passwordHash: str) -> bool:
+        '''
+        True if the stored hash was made with a different method or cost than the policy's
+        '''
+        if self.method.startswith('argon2'):
+            return not passwordHash.startswith('$argon2') or self._argon2.check_needs_rehash(passwordHash)
+        return passwordHash.split('$', 1)[0] != self.method
+
+
+def _seconds_per_hash(method, password='Calibrate1234!', rounds=3):
+    policy = HashingPolicy(method)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        policy.hash(password)
+    return (time.perf_counter() - start) / rounds
+
+
+def _closest(candidates, targetSeconds):
+    method, previous = None, 0.0
+    for candidate in candidates:
+        seconds = _seconds_per_hash(candidate)
+        if method and seconds - targetSeconds > targetSeconds - previous:
+            break
+        method, previous = candidate, seconds
+        if seconds >= targetSeconds:
+            break
+    return method
+
+
+def calibrate(scheme: str = 'pbkdf2', targetSeconds: float = 0.25, digest: str = 'sha256',
+              memoryCost: int = 65536) -> str:
+    '''
+    Returns the hashing method whose cost is closest to the target hashing time on this machine
+    '''
+    if scheme == 'pbkdf2':
+        probe = 20000
+        seconds = _seconds_per_hash(f'pbkdf2:{digest}:{probe}')
+        iterations = max(int(probe * targetSeconds / seconds) // 1000 * 1000, 1000)
+        return f'pbkdf2:{digest}:{iterations}'
+    if scheme == 'scrypt':
+        return _closest((f'scrypt:{2 ** exponent}:8:1' for exponent in range(10, 21)), targetSeconds)
+    if scheme == 'argon2':
+        _require_argon2()
+        return _closest((f'argon2:{timeCost}:{memoryCost}:4' for timeCost in range(1, 65)), targetSeconds)
+    raise ValueError(f'Unknown hashing scheme {scheme}')
@@ -0,0 +1,142 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+import csv
+import json
+import os
+
+from flask_authbp.hashing import HashingPolicy, recognized
+from flask_authbp.messages import RegistrationStatus
+from flask_authbp.validation import name_valid, pass_valid
+
+
+MALFORMED_RECORD = 'Malformed record'
+
+
+class UserRecord(NamedTuple):
+    '''
+    Fields are taken from the file as they are, validate checks their types
+    '''
+    line: int
+    username: Any
+    password: Any
+    passwordHash: Any
+
+
+class ImportReport(NamedTuple):
+    read: int
+    imported: int
+    existing: int
+    invalid: int
+
+
+def read_users(path: str, fileFormat: Optional[str] = None) -> Iterator[UserRecord]:
+    '''
+    Streams users from a CSV file with a header or from a JSON lines file. Each record has a
+    username and either a plaintext password or an already hashed password_hash. Lines that
+    are not JSON objects are yielded as records without fields, for validate to reject.
+    '''
+    fileFormat = fileFormat or ('csv' if path.endswith('.csv') else 'jsonl')
+    with open(path, newline='', encoding='utf-8') as f:
+        rows: Iterable = enumerate(csv.DictReader(f), 2) if fileFormat == 'csv' else _json_rows(f)
+        for line, row in rows:
+            if isinstance(row, dict):
+                yield UserRecord(line, row.get('username', ''), row.get('password'), row.get('password_hash'))
+            else:
+                yield UserRecord(line, None, None, None)
+
+
+def _json_rows(f):
+    for line, text in enumerate(f, 1):
+        if not text.strip():
+            continue
+        try:
+            yield line, json.loads(text)
+        except ValueError:
+            yield line, None
+
+
+def validate(record: UserRecord) -> Optional[str]:
+    '''
+    Returns why the record can not be imported, the same rules as /register apply
+    '''
+    if not isinstance(record.username, str) or not all(
+            value is None or isinstance(value, str) for value in (record.password, record.passwordHash)):
+        return MALFORMED_RECORD
+    if not name_valid(record.username):
+        return RegistrationStatus.InvalidUsername
+    if record.passwordHash:
+        return None if recognized(record.passwordHash) else RegistrationStatus.InvalidPasswordHash
+    if not record.password or not pass_valid(record.password):
+        return RegistrationStatus.InvalidPassword
+    return None
+
+
+def _load_checkpoint(checkpoint, path):
+    if checkpoint and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            state = json.load(f)
+        if state.get('path') == os.path.abspath(path):
+            return state
+    return {'path': os.path.abspath(path), 'read': 0, 'imported': 0, 'existing': 0, 'invalid': 0}
+
+
+def _save_checkpoint(checkpoint, state):
+    temporary = checkpoint + '.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(state, f)
+    os.replace(temporary, checkpoint)
+
+
+def import_users(path: str, store_users: Callable[[Iterable[Tuple[str, str]]], int],
+                 hashingPolicy: Optional[HashingPolicy] = None, fileFormat: Optional[str] = None,
+                 workers: Optional[int] = None, batchSize: int = 1000, checkpoint: Optional[str] = None,
+                 progress: Optional[Callable[[ImportReport], None]] = None,
+                 rejected: Optional[Callable[[UserRecord, str], None]] = None,
+                 stored: Optional[Callable[[Iterable[str]], None]] = None) -> ImportReport:
+    '''
+    Validates and hashes the users from the file across a process pool (workers=0 hashes in
+    this process) and writes them to the storage batch by batch. With a checkpoint file an
+    interrupted import resumes after the last stored batch.
+    '''
+    hashingPolicy = hashingPolicy or HashingPolicy()
+    state = _load_checkpoint(checkpoint, path)
+    records = islice(read_users(path, fileFormat), state['read'], None)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    pool = ProcessPoolExecutor(workers) if workers else None
+    try:
+        while True:
+            batch = list(islice(records, batchSize))
+            if not batch:
+                break
+            valid = []
+            for record in batch:
+                reason = validate(record)
+                if reason:
+                    state['invalid'] += 1
+                    if rejected:
+                        rejected(record, reason)
+                else:
+                    valid.append(record)
+            plaintext = [record.password for record in valid if not record.passwordHash]
+            if pool and plaintext:
+                chunksize = max(len(plaintext) // (workers * 4), 1)
+                hashes = pool.map(hashingPolicy.hash, plaintext, chunksize=chunksize)
+            else:
+                hashes = map(hashingPolicy.hash, plaintext)
+            users = [(record.username, record.passwordHash or next(hashes)) for record in valid]
+            imported = store_users(users) if users else 0
+            if stored:
+                stored(username for username, _ in users)
+            state['read'] += len(batch)
+            state['imported'] += imported
+            state['existing'] += len(users) - imported
+            if checkpoint:
+                _save_checkpoint(checkpoint, state)
+            if progress:
+                progress(ImportReport(state['read'], state['imported'], state['existing'], state['invalid']))
+    finally:
+        if pool:
+            pool.shutdown()
+    return ImportReport(state['read'], state['imported'], state['existing'], state['invalid'])
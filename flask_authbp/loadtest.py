@@ -0,0 +1,154 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http.client import HTTPException
+from http.cookiejar import CookieJar
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.request import HTTPCookieProcessor, HTTPSHandler, Request, build_opener
+
+import json
+import math
+import random
+import ssl
+import time
+
+from flask_authbp.messages import RegistrationStatus
+
+
+class LoadTestReport(NamedTuple):
+    requests: int
+    errors: int
+    seconds: float
+    latencies: Dict[str, List[float]]
+    failures: Dict[str, int]
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.seconds if self.seconds else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+    def percentile(self, kind: str, p: float) -> float:
+        '''
+        Latency percentile in seconds for a request kind, nearest-rank method
+        '''
+        values = sorted(self.latencies.get(kind, ()))
+        if not values:
+            return 0.0
+        rank = max(math.ceil(p / 100.0 * len(values)) - 1, 0)
+        return values[min(rank, len(values) - 1)]
+
+
+def _opener(insecure):
+    context = ssl.create_default_context()
+    if insecure:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return build_opener(HTTPCookieProcessor(CookieJar()), HTTPSHandler(context=context))
+
+
+def _send(opener, url, method, payload=None, headers=None, timeout=10.0) -> Tuple[int, float, Optional[Dict]]:
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = Request(url, data=data, method=method, headers=dict(headers or {}))
+    if data is not None:
+        request.add_header('Content-Type', 'application/json')
+    start = time.perf_counter()
+    try:
+        with opener.open(request, timeout=timeout) as response:
+            body = response.read()
+            status = response.status
+    except HTTPError as e:
+        try:
+            body = e.read()
+        except (HTTPException, OSError):
+            body = b''
+        status = e.code
+    except (URLError, OSError, HTTPException):
+        return 0, time.perf_counter() - start, None
+    elapsed = time.perf_counter() - start
+    try:
+        content = json.loads(body) if body else None
+    except ValueError:
+        content = None
+    return status, elapsed, content if isinstance(content, dict) else None
+
+
+def _run_user(baseUrl, username, password, operations, resource, method, insecure, timeout):
+    '''
+    Logs a single virtual user in and replays its operations, keeping cookies and
+    the access token between requests the same way a browser or API client would.
+    '''
+    opener = _opener(insecure)
+    credentials = {'username': username, 'password': password}
+    headers: Dict[str, str] = {}
+    results = []
+
+    def login():
+        status, elapsed, content = _send(opener, baseUrl + '/login', 'POST', credentials, timeout=timeout)
+        if content and 'access_token' in content:
+            headers['Authorization'] = f'Bearer {content["access_token"]}'
+        results.append(('login', status, elapsed))
+
+    login()
+    for operation in operations:
+        if operation == 'login':
+            login()
+        else:
+            status, elapsed, _ = _send(opener, baseUrl + resource, method, headers=headers, timeout=timeout)
+            results.append(('resource', status, elapsed))
+    return results
+
+
+def seed_users(baseUrl, users, prefix='LoadUser', password='LoadTest1234!', insecure=False, timeout=10.0):
+    '''
+    Registers the load test users through the register endpoint, existing users are reused
+    '''
+    opener = _opener(insecure)
+    credentials = []
+    for i in range(users):
+        username = f'{prefix}{i}'
+        status, _, content = _send(
+            opener, baseUrl + '/register', 'POST', {'username': username, 'password': password}, timeout=timeout
+        )
+        exists = status == 400 and content and content.get('message') == RegistrationStatus.UserExists
+        if status != 200 and not exists:
+            raise RuntimeError(f'Registering {username} failed with status {status}')
+        credentials.append((username, password))
+    return credentials
+
+
+def run_loadtest(baseUrl: str, users: int = 10, requestsPerUser: int = 10, loginRatio: float = 0.1,
+                 workers: int = 8, resource: str = '/testing/resource', method: str = 'POST',
+                 processes: bool = False, insecure: bool = False, timeout: float = 10.0,
+                 seed: Optional[int] = None) -> LoadTestReport:
+    '''
+    Seeds users and drives a mix of logins and authorized requests against a running server
+    '''
+    baseUrl = baseUrl.rstrip('/')
+    credentials = seed_users(baseUrl, users, insecure=insecure, timeout=timeout)
+    rng = random.Random(seed)
+    plans = [
+        ['login' if rng.random() < loginRatio else 'resource' for _ in range(requestsPerUser)]
+        for _ in credentials
+    ]
+    executorType = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    start = time.perf_counter()
+    with executorType(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_run_user, baseUrl, username, password, plan, resource, method, insecure, timeout)
+            for (username, password), plan in zip(credentials, plans)
+        ]
+        results = [result for future in futures for result in future.result()]
+    seconds = time.perf_counter() - start
+
+    latencies: Dict[str, List[float]] = {}
+    failures: Dict[str, int] = {}
+    errors = 0
+    for kind, status, elapsed in results:
+        latencies.setdefault(kind, []).append(elapsed)
+        if not 200 <= status < 300:
+            errors += 1
+            key = f'{kind}:{status}'
+            failures[key] = failures.get(key, 0) + 1
+    return LoadTestReport(len(results), errors, seconds, latencies, failures)
@@ -0,0 +1,392 @@
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Type, Union
+from flask_login import UserMixin  # type: ignore
+
+import base64
+import binascii
+import sys
+import threading
+import time
+
+from flask_authbp import flask_login, sessionbased, tokenbased
+from flask_authbp.types import UserStorage
+
+
+class _Stripes:
+    '''
+    Fixed set of locks picked by key hash, so unrelated keys rarely contend
+    '''
+    def __init__(self, count: int = 64) -> None:
+        self._locks = [threading.Lock() for _ in range(count)]
+
+    def __call__(self, key) -> threading.Lock:
+        return self._locks[hash(key) % len(self._locks)]
+
+
+class _Session:
+    __slots__ = ('username', 'expires')
+
+    def __init__(self, username, expires):
+        self.username = username
+        self.expires = expires
+
+
+class _RefreshToken:
+    __slots__ = ('username', 'token', 'expires')
+
+    def __init__(self, username, token, expires):
+        self.username = username
+        self.token = token
+        self.expires = expires
+
+
+def _session_key(sessionId):
+    '''
+    token_urlsafe ids are kept as their raw bytes, anything else as the string itself
+    '''
+    try:
+        key = base64.urlsafe_b64decode(sessionId + '=' * (-len(sessionId) % 4))
+    except (binascii.Error, ValueError):
+        return sessionId
+    return key if base64.urlsafe_b64encode(key).rstrip(b'=').decode() == sessionId else sessionId
+
+
+def _session_id(key):
+    return key if isinstance(key, str) else base64.urlsafe_b64encode(key).rstrip(b'=').decode()
+
+
+def _hash_key(userAgentHash):
+    try:
+        key = bytes.fromhex(userAgentHash)
+    except ValueError:
+        return userAgentHash
+    return key if key.hex() == userAgentHash else userAgentHash
+
+
+def _hash_id(key):
+    return key if isinstance(key, str) else key.hex()
+
+
+class _SortedKeys:
+    '''
+    Keys kept sorted in bounded chunks, so adding, removing and resuming after a key cost
+    O(log n + chunkSize) instead of sorting the whole key set for every listing page
+    '''
+    def __init__(self, chunkSize: int = 512) -> None:
+        self._chunkSize = chunkSize
+        self._chunks: List[list] = []
+        self._maxes: list = []
+        self._lock = threading.Lock()
+
+    def add(self, key) -> None:
+        with self._lock:
+            if not self._chunks:
+                self._chunks.append([key])
+                self._maxes.append(key)
+                return
+            i = min(bisect_left(self._maxes, key), len(self._maxes) - 1)
+            chunk = self._chunks[i]
+            j = bisect_left(chunk, key)
+            if j < len(chunk) and chunk[j] == key:
+                return
+            chunk.insert(j, key)
+            self._maxes[i] = chunk[-1]
+            if len(chunk) > 2 * self._chunkSize:
+                self._chunks[i:i + 1] = [chunk[:self._chunkSize], chunk[self._chunkSize:]]
+                self._maxes[i:i + 1] = [chunk[self._chunkSize - 1], chunk[-1]]
+
+    def discard(self, key) -> None:
+        with self._lock:
+            i = bisect_left(self._maxes, key)
+            if i == len(self._maxes):
+                return
+            chunk = self._chunks[i]
+            j = bisect_left(chunk, key)
+            if j == len(chunk) or chunk[j] != key:
+                return
+            del chunk[j]
+            if chunk:
+                self._maxes[i] = chunk[-1]
+            else:
+                del self._chunks[i]
+                del self._maxes[i]
+
+    def after(self, key=None) -> Iterator:
+        '''
+        Yields the keys greater than key a chunk at a time, so writers are only held up briefly
+        '''
+        while True:
+            with self._lock:
+                i = 0 if key is None else bisect_right(self._maxes, key)
+                if i == len(self._chunks):
+                    return
+                chunk = self._chunks[i]
+                keys = chunk if key is None else chunk[bisect_right(chunk, key):]
+                keys = list(keys)
+            yield from keys
+            key = keys[-1]
+
+
+class _KeyIndex:
+    '''
+    Sorted raw bytes keys followed by sorted string keys
+    '''
+    def __init__(self) -> None:
+        self._bytes = _SortedKeys()
+        self._strings = _SortedKeys()
+
+    def _part(self, key):
+        return self._strings if isinstance(key, str) else self._bytes
+
+    def add(self, key) -> None:
+        self._part(key).add(key)
+
+    def discard(self, key) -> None:
+        self._part(key).discard(key)
+
+    def after(self, key=None) -> Iterator:
+        if not isinstance(key, str):
+            yield from self._bytes.after(key)
+            key = None
+        yield from self._strings.after(key)
+
+
+class _Expiring:
+    def __init__(self, ttl: Optional[float], sweepEvery: int) -> None:
+        self._ttl = ttl
+        self._sweepEvery = sweepEvery
+        self._stores = 0
+
+    def _expires(self):
+        return time.monotonic() + self._ttl if self._ttl else 0.0
+
+    def _stored(self):
+        self._stores += 1
+        if self._ttl and self._stores % self._sweepEvery == 0:
+            self.evict_expired()
+
+    def evict_expired(self) -> int:
+        return 0
+
+
+class MemoryUserStorage(UserStorage):
+    '''
+    Thread safe in-memory users, usernames are interned so sessions share them
+    '''
+    def __init__(self, stripes: int = 64) -> None:
+        self._passwordHashes: Dict[str, str] = {}
+        self._usernameIndex = _SortedKeys()
+        self._stripes = _Stripes(stripes)
+
+    def store_user(self, username: str, passwordHash: str) -> bool:
+        username = sys.intern(username)
+        with self._stripes(username):
+            if username in self._passwordHashes:
+                return False
+            self._passwordHashes[username] = passwordHash
+        self._usernameIndex.add(username)
+        return True
+
+    def store_users(self, users) -> int:
+        stored = 0
+        for username, passwordHash in users:
+            username = sys.intern(username)
+            with self._stripes(username):
+                if username in self._passwordHashes:
+                    continue
+                self._passwordHashes[username] = passwordHash
+            self._usernameIndex.add(username)
+            stored += 1
+        return stored
+
+    def update_password_hash(self, username: str, passwordHash: str) -> None:
+        with self._stripes(username):
+            if username in self._passwordHashes:
+                self._passwordHashes[username] = passwordHash
+
+    def find_password_hash(self, username):
+        return self._passwordHashes.get(username)
+
+    def iter_usernames(self, after=None) -> Iterator[str]:
+        return self._usernameIndex.after(after)
+
+
+class MemorySessionStorage(MemoryUserStorage, sessionbased.Storage, _Expiring):
+    '''
+    In-memory storage for session based authentication, for single node deployments.
+    Sessions older than sessionTtl seconds are evicted on access and every sweepEvery stores.
+    Without a TTL a session costs a raw bytes id and a dict slot pointing at the interned username.
+    '''
+    def __init__(self, sessionTtl: Optional[float] = None, stripes: int = 64, sweepEvery: int = 10000) -> None:
+        MemoryUserStorage.__init__(self, stripes)
+        _Expiring.__init__(self, sessionTtl, sweepEvery)
+        self._sessions: Dict[object, Union[str, _Session]] = {}
+        self._sessionIndex = _KeyIndex()
+        self._userSessions: Dict[str, Set[object]] = {}
+
+    def store_session(self, sessionId, username):
+        key = _session_key(sessionId)
+        username = sys.intern(username)
+        with self._stripes(key):
+            self._sessions[key] = _Session(username, self._expires()) if self._ttl else username
+        self._sessionIndex.add(key)
+        # indexing the same key object here lets add_user_session find it already present
+        with self._stripes(username):
+            self._userSessions.setdefault(username, set()).add(key)
+        self._stored()
+
+    def find_session(self, sessionId):
+        key = _session_key(sessionId)
+        session = self._sessions.get(key)
+        if session is None or isinstance(session, str):
+            return session
+        if session.expires < time.monotonic():
+            self._remove(key)
+            return None
+        return session.username
+
+    def _remove(self, key):
+        with self._stripes(key):
+            session = self._sessions.pop(key, None)
+        if session is not None:
+            self._sessionIndex.discard(key)
+            username = session if isinstance(session, str) else session.username
+            with self._stripes(username):
+                sessionKeys = self._userSessions.get(username)
+                if sessionKeys is not None:
+                    sessionKeys.discard(key)
+                    if not sessionKeys:
+                        self._userSessions.pop(username)
+
+    def remove_session(self, sessionId):
+        self._remove(_session_key(sessionId))
+
+    def add_user_session(self, username, sessionId):
+        with self._stripes(username):
+            self._userSessions.setdefault(sys.intern(username), set()).add(_session_key(sessionId))
+
+    def remove_user_session(self, username, sessionId):
+        with self._stripes(username):
+            sessionKeys = self._userSessions.get(username)
+            if sessionKeys is not None:
+                sessionKeys.discard(_session_key(sessionId))
+                if not sessionKeys:
+                    self._userSessions.pop(username)
+
+    def find_user_sessions(self, username):
+        with self._stripes(username):
+            sessionKeys = list(self._userSessions.get(username, ()))
+        return [_session_id(key) for key in sessionKeys]
+
+    def remove_user_sessions(self, username) -> int:
+        with self._stripes(username):
+            sessionKeys = self._userSessions.pop(username, set())
+        for key in sessionKeys:
+            with self._stripes(key):
+                self._sessions.pop(key, None)
+            self._sessionIndex.discard(key)
+        return len(sessionKeys)
+
+    def iter_sessions(self, after=None) -> Iterator[Tuple[str, str]]:
+        for key in self._sessionIndex.after(None if after is None else _session_key(after)):
+            session = self._sessions.get(key)
+            if session is not None:
+                yield _session_id(key), session if isinstance(session, str) else session.username
+
+    def evict_expired(self) -> int:
+        now = time.monotonic()
+        expired = [
+            key for key, session in list(self._sessions.items())
+            if not isinstance(session, str) and session.expires < now
+        ]
+        for key in expired:
+            self._remove(key)
+        return len(expired)
+
+
+class MemoryTokenStorage(MemoryUserStorage, tokenbased.Storage, _Expiring):
+    '''
+    In-memory storage for token based authentication, for single node deployments.
+    Refresh tokens older than refreshTtl seconds are evicted on access and every sweepEvery stores.
+    '''
+    def __init__(self, refreshTtl: Optional[float] = None, stripes: int = 64, sweepEvery: int = 10000) -> None:
+        MemoryUserStorage.__init__(self, stripes)
+        _Expiring.__init__(self, refreshTtl, sweepEvery)
+        self._refreshTokens: Dict[object, _RefreshToken] = {}
+        self._refreshTokenIndex = _KeyIndex()
+        self._userRefreshTokens: Dict[str, Set[object]] = {}
+
+    def store_refresh_token(self, username, refreshTokenEncoded, userAgentHash):
+        key = _hash_key(userAgentHash)
+        username = sys.intern(username)
+        with self._stripes(key):
+            previous = self._refreshTokens.get(key)
+            self._refreshTokens[key] = _RefreshToken(username, refreshTokenEncoded, self._expires())
+        self._refreshTokenIndex.add(key)
+        if previous is not None and previous.username != username:
+            self._unindex(previous.username, key)
+        with self._stripes(username):
+            self._userRefreshTokens.setdefault(username, set()).add(key)
+        self._stored()
+
+    def find_refresh_token(self, userAgentHash):
+        key = _hash_key(userAgentHash)
+        refreshToken = self._refreshTokens.get(key)
+        if refreshToken is None:
+            return None
+        if refreshToken.expires and refreshToken.expires < time.monotonic():
+            self._remove(key)
+            return None
+        return refreshToken.username, refreshToken.token
+
+    def _unindex(self, username, key):
+        with self._stripes(username):
+            keys = self._userRefreshTokens.get(username)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    self._userRefreshTokens.pop(username)
+
+    def _remove(self, key):
+        with self._stripes(key):
+            refreshToken = self._refreshTokens.pop(key, None)
+        if refreshToken is not None:
+            self._refreshTokenIndex.discard(key)
+            self._unindex(refreshToken.username, key)
+
+    def remove_user_refresh_tokens(self, username) -> int:
+        with self._stripes(username):
+            keys = self._userRefreshTokens.pop(username, set())
+        for key in keys:
+            with self._stripes(key):
+                self._refreshTokens.pop(key, None)
+            self._refreshTokenIndex.discard(key)
+        return len(keys)
+
+    def iter_refresh_tokens(self, after=None) -> Iterator[Tuple[str, str]]:
+        for key in self._refreshTokenIndex.after(None if after is None else _hash_key(after)):
+            refreshToken = self._refreshTokens.get(key)
+            if refreshToken is not None:
+                yield _hash_id(key), refreshToken.username
+
+    def evict_expired(self) -> int:
+        now = time.monotonic()
+        expired = [
+            key for key, refreshToken in list(self._refreshTokens.items())
+            if refreshToken.expires and refreshToken.expires < now
+        ]
+        for key in expired:
+            self._remove(key)
+        return len(expired)
+
+
+class MemoryFlaskLoginStorage(MemoryUserStorage, flask_login.Storage):
+    '''
+    In-memory storage for Flask-Login, userFactory turns a username into the user object
+    '''
+    def __init__(self, userFactory: Callable[[str], Type[UserMixin]], stripes: int = 64) -> None:
+        MemoryUserStorage.__init__(self, stripes)
+        self._userFactory = userFactory
+
+    def load_user(self, username) -> Type[UserMixin]:
+        return self._userFactory(username) if username in self._passwordHashes else None
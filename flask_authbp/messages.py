@@ -18,6 +18,10 @@ class _RegistrationStatus:
     def InvalidPassword(self):
         return 'Invalid password'
 
+    @constant
+    def InvalidPasswordHash(self):
+        return 'Unrecognized password hash'
+
     @constant
     def UserExists(self):
         return 'Username already exists'
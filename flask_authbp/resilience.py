@@ -0,0 +1,204 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Dict, Iterable, Optional
+from flask import current_app, has_app_context
+from werkzeug.exceptions import ServiceUnavailable
+
+import functools
+import threading
+import time
+
+
+class StorageUnavailable(ServiceUnavailable):
+    description = 'Authentication storage unavailable'
+
+
+class CircuitBreaker:
+    '''
+    Opens after failureThreshold consecutive failures and rejects calls until resetTimeout
+    seconds have passed, then lets a single trial call through (half open).
+    '''
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failureThreshold: int = 5, resetTimeout: float = 30.0) -> None:
+        self.failureThreshold = failureThreshold
+        self.resetTimeout = resetTimeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._openedAt = 0.0
+        self._trialRunning = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._openedAt >= self.resetTimeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if time.monotonic() - self._openedAt < self.resetTimeout or self._trialRunning:
+                return False
+            self._state = self.HALF_OPEN
+            self._trialRunning = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trialRunning = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trialRunning = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failureThreshold:
+                self._state = self.OPEN
+                self._openedAt = time.monotonic()
+
+
+class _StaleCache:
+    def __init__(self, size, maxAge) -> None:
+        self._size = size
+        self._maxAge = maxAge
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            value, storedAt = self._entries.get(key, (None, 0.0))
+            if value is not None and time.monotonic() - storedAt > self._maxAge:
+                self._entries.pop(key)
+                return None
+            return value
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_values(self, value):
+        with self._lock:
+            for key in [key for key, (cached, _) in self._entries.items() if cached == value]:
+                self._entries.pop(key)
+
+
+class GuardedStorage:
+    '''
+    Wraps any of the Storage implementations with per call timeouts and a circuit breaker.
+    Failing calls raise StorageUnavailable (503). Results of the methods in staleMethods are
+    remembered, so recently verified identities can still be served while storage is down.
+
+    Timed calls run in a worker thread, so methods returning objects bound to the request's
+    database session (like an ORM user from load_user) belong in inlineMethods, which run
+    in the calling thread without a timeout, and must not be listed in staleMethods.
+    '''
+    def __init__(self, storage, timeout: Optional[float] = 1.0, breaker: Optional[CircuitBreaker] = None,
+                 staleCacheSize: int = 0, staleMaxAge: float = 300.0,
+                 staleMethods: Iterable[str] = ('find_session',), inlineMethods: Iterable[str] = ('load_user',),
+                 workers: int = 16) -> None:
+        self._storage = storage
+        self._timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._staleMethods = frozenset(staleMethods)
+        self._inlineMethods = frozenset(inlineMethods)
+        self._staleCache = _StaleCache(staleCacheSize, staleMaxAge) if staleCacheSize > 0 else None
+        self._executor = ThreadPoolExecutor(max_workers=workers) if timeout else None
+        self._metrics: Dict[str, int] = dict.fromkeys(
+            ('calls', 'failures', 'timeouts', 'rejected', 'staleHits'), 0
+        )
+        self._metricsLock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        return self.breaker.state
+
+    def metrics(self) -> Dict:
+        with self._metricsLock:
+            metrics = dict(self._metrics)
+        metrics['state'] = self.state
+        metrics['staleEntries'] = len(self._staleCache) if self._staleCache else 0
+        return metrics
+
+    def _count(self, name):
+        with self._metricsLock:
+            self._metrics[name] += 1
+
+    def _run(self, name, method, args, kwargs):
+        if self._executor is None or name in self._inlineMethods:
+            return method(*args, **kwargs)
+        if has_app_context():
+            app = current_app._get_current_object()
+
+            def call():
+                with app.app_context():
+                    return method(*args, **kwargs)
+        else:
+            def call():
+                return method(*args, **kwargs)
+        future = self._executor.submit(call)
+        try:
+            return future.result(timeout=self._timeout)
+        except TimeoutError:
+            future.cancel()
+            self._count('timeouts')
+            raise
+
+    def _invalidate(self, name, args):
+        if name == 'remove_session' and args:
+            self._staleCache.discard(('find_session', (args[0],)))
+        elif name == 'remove_user_sessions' and args:
+            self._staleCache.discard_values(args[0])
+
+    def _call(self, name, method, *args, **kwargs):
+        self._count('calls')
+        stale = self._staleCache is not None and name in self._staleMethods and not kwargs
+        if not self.breaker.allow():
+            self._count('rejected')
+            return self._stale_or_raise(name, args, stale, None)
+        try:
+            result = self._run(name, method, args, kwargs)
+        except Exception as e:
+            self._count('failures')
+            self.breaker.record_failure()
+            return self._stale_or_raise(name, args, stale, e)
+        self.breaker.record_success()
+        if stale and result is not None:
+            self._staleCache.put((name, args), result)
+        elif stale:
+            self._staleCache.discard((name, args))
+        elif self._staleCache is not None:
+            self._invalidate(name, args)
+        return result
+
+    def _stale_or_raise(self, name, args, stale, error):
+        if stale:
+            result = self._staleCache.get((name, args))
+            if result is not None:
+                self._count('staleHits')
+                return result
+        raise StorageUnavailable() from error
+
+    def __getattr__(self, name):
+        attribute = getattr(self._storage, name)
+        if not callable(attribute):
+            return attribute
+        guarded = functools.partial(self._call, name, attribute)
+        if getattr(attribute, 'isOptional', False):
+            guarded.isOptional = True
+        return guarded
@@ -1,24 +1,20 @@
 from http import HTTPStatus
-from typing import Callable, Tuple
+from typing import Callable, Iterator, List, Optional, Tuple
 from flask import Blueprint, abort, redirect, request, session  # type: ignore
 from flask_restx import Resource  # type: ignore
 
+import hashlib
 import secrets
-from abc import ABC, abstractmethod
+from abc import abstractmethod
 
-from ._utility import authentication_blueprint, PermissionDecorator
-from .types import Authentication
+from . import audit as auditlog
+from ._utility import authentication_blueprint, add_admin_routes, user_listing, PermissionDecorator, SingleFlight
+from .bloom import UsernameFilter
+from .hashing import HashingPolicy
+from .types import Authentication, UserStorage, implemented, optional
 
 
-class Storage(ABC):
-    @abstractmethod
-    def store_user(self, username: str, passwordHash: str) -> None:
-        ...
-
-    @abstractmethod
-    def find_password_hash(self, username):
-        ...
-
+class Storage(UserStorage):
     @abstractmethod
     def store_session(self, sessionId, username):
         ...
@@ -31,16 +27,79 @@ class Storage(ABC):
     def remove_session(self, sessionId):
         ...
 
-
-def create_blueprint(storage: Storage) -> Tuple[Blueprint, Callable]:
+    def add_user_session(self, username, sessionId):
+        '''
+        Adds the session to the user's session index, needed for remove_user_sessions
+        '''
+
+    def remove_user_session(self, username, sessionId):
+        '''
+        Removes the session from the user's session index
+        '''
+
+    @optional
+    def find_user_sessions(self, username) -> List[str]:
+        '''
+        Returns the ids of all sessions of the user. Implement it or remove_user_sessions
+        to enable /logout/all.
+        '''
+        raise NotImplementedError
+
+    @optional
+    def iter_sessions(self, after=None) -> Iterator[Tuple[str, str]]:
+        '''
+        Yields (sessionId, username) pairs in a stable order, starting after the given sessionId
+        '''
+        raise NotImplementedError
+
+    @optional
+    def remove_user_sessions(self, username) -> int:
+        '''
+        Removes all sessions of the user and returns their number.
+        Override it to remove them in a single batched call.
+        '''
+        sessionIds = list(self.find_user_sessions(username))
+        for sessionId in sessionIds:
+            self.remove_session(sessionId)
+            self.remove_user_session(username, sessionId)
+        return len(sessionIds)
+
+
+def create_blueprint(storage: Storage, hashingPolicy: Optional[HashingPolicy] = None,
+                     usernameFilter: Optional[UsernameFilter] = None,
+                     audit: Optional[Callable] = None,
+                     isAdmin: Optional[Callable] = None) -> Tuple[Blueprint, Callable]:
     '''
-    Returns the blueprint and authorization decorator for session based authorization
+    Returns the blueprint and authorization decorator for session based authorization.
+    If isAdmin is given, users for which it returns True can list users and sessions under /admin.
     '''
     bp, ns = authentication_blueprint(
-        Authentication(storage.find_password_hash, storage.store_user, _SessionGenerator(storage))
+        Authentication(
+            storage.find_password_hash, storage.store_user, _SessionGenerator(storage),
+            implemented(storage, 'update_password_hash'), implemented(storage, 'iter_usernames'),
+            storage.store_users
+        ),
+        hashingPolicy, usernameFilter, audit
     )
-    add_logout_route(ns, storage)
-    return bp, PermissionDecorator(_UserGetter(storage))
+    add_logout_route(ns, storage, audit)
+    if implemented(storage, 'find_user_sessions') or implemented(storage, 'remove_user_sessions'):
+        add_logout_all_route(ns, storage, audit)
+    permission_required = PermissionDecorator(_UserGetter(storage))
+    if isAdmin:
+        listings = {}
+        if implemented(storage, 'iter_usernames'):
+            listings['users'] = user_listing(storage.iter_usernames)
+        if implemented(storage, 'iter_sessions'):
+            listings['sessions'] = _session_listing(storage)
+        add_admin_routes(ns, permission_required, isAdmin, listings)
+    return bp, permission_required
+
+
+def _session_listing(storage):
+    def iterate(after):
+        for sessionId, username in storage.iter_sessions(after):
+            yield sessionId, {'session': hashlib.sha256(sessionId.encode()).hexdigest()[:16], 'username': username}
+    return iterate
 
 
 class _SessionGenerator:
@@ -58,19 +117,21 @@ class _SessionGenerator:
         sessionId = self._generate_session_id()
         session['_id'] = sessionId
         self._storage.store_session(sessionId, username)
+        self._storage.add_user_session(username, sessionId)
 
 
 class _UserGetter:
     def __init__(self, storage) -> None:
         self._storage = storage
+        self._find_session = SingleFlight(storage.find_session)
 
     def __call__(self):
         if '_id' not in session:
             abort(HTTPStatus.FORBIDDEN, 'Login missing')
-        return self._storage.find_session(session['_id'])
+        return self._find_session(session['_id'])
 
 
-def add_logout_route(ns, storage: Storage):
+def add_logout_route(ns, storage: Storage, audit=None):
     @ns.route('/logout')
     class Logout(Resource):
         @ns.response(HTTPStatus.OK, 'Success')
@@ -81,8 +142,41 @@ def add_logout_route(ns, storage: Storage):
                 url = request.url.replace('http://', 'https://', 1)
                 return redirect(url, code=HTTPStatus.MOVED_PERMANENTLY)
             if '_id' in session:
-                storage.remove_session(session['_id'])
-                session.pop('_id')
+                sessionId = session.pop('_id')
+                username = storage.find_session(sessionId)
+                storage.remove_session(sessionId)
+                if username:
+                    storage.remove_user_session(username, sessionId)
+                auditlog.record(audit, auditlog.LOGOUT, username)
                 return HTTPStatus.OK
             else:
                 ns.abort(HTTPStatus.FORBIDDEN, 'Authentication missing')
+
+
+def add_logout_all_route(ns, storage: Storage, audit=None):
+    @ns.route('/logout/all')
+    class LogoutAll(Resource):
+        @ns.response(HTTPStatus.OK, 'Success')
+        @ns.response(HTTPStatus.FORBIDDEN, 'Authorization missing')
+        @ns.response(HTTPStatus.MOVED_PERMANENTLY, 'Insecure connection')
+        def post(self):
+            '''
+            Logs the current user out of all sessions
+            '''
+            if not request.is_secure:
+                url = request.url.replace('http://', 'https://', 1)
+                return redirect(url, code=HTTPStatus.MOVED_PERMANENTLY)
+            username = storage.find_session(session['_id']) if '_id' in session else None
+            if not username:
+                ns.abort(HTTPStatus.FORBIDDEN, 'Authentication missing')
+            removed = revoke_user(storage, username)
+            session.pop('_id')
+            auditlog.record(audit, auditlog.LOGOUT_ALL, username)
+            return {'removed': removed}
+
+
+def revoke_user(storage: Storage, username) -> int:
+    '''
+    Removes all sessions of the user, e.g. after a password change
+    '''
+    return storage.remove_user_sessions(username)
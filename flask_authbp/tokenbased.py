@@ -1,26 +1,26 @@
 from http import HTTPStatus
-from typing import Callable, Tuple
-from flask import Blueprint, abort, request, current_app
+from typing import Callable, Iterator, Optional, Tuple
+from flask import Blueprint, abort, redirect, request, current_app
 from flask_restx import Resource, fields  # type: ignore
 from werkzeug.security import check_password_hash
 
 import jwt
-import datetime
-from abc import ABC, abstractmethod
-
-from flask_authbp._utility import authentication_blueprint, PermissionDecorator
-from flask_authbp.types import Authentication
-
-
-class Storage(ABC):
-    @abstractmethod
-    def store_user(self, username: str, passwordHash: str) -> None:
-        ...
-
-    @abstractmethod
-    def find_password_hash(self, username):
-        ...
-
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from abc import abstractmethod
+
+from flask_authbp._utility import authentication_blueprint, add_admin_routes, user_listing, PermissionDecorator
+from flask_authbp import audit as auditlog
+from flask_authbp.bloom import UsernameFilter
+from flask_authbp.codec import REFRESH_TOKEN, current_codec
+from flask_authbp.hashing import HashingPolicy
+from flask_authbp.types import Authentication, UserStorage, implemented, optional
+
+
+class Storage(UserStorage):
     @abstractmethod
     def find_refresh_token(self, userAgentHash):
         ...
@@ -29,6 +29,21 @@ class Storage(ABC):
     def store_refresh_token(self, username, refreshTokenEncoded, userAgentHash):
         ...
 
+    @optional
+    def iter_refresh_tokens(self, after=None) -> Iterator[Tuple[str, str]]:
+        '''
+        Yields (userAgentHash, username) pairs in a stable order, starting after the given one
+        '''
+        raise NotImplementedError
+
+    @optional
+    def remove_user_refresh_tokens(self, username) -> int:
+        '''
+        Removes all refresh tokens of the user in a single batched call and returns their number.
+        Implement it to enable /logout/all.
+        '''
+        raise NotImplementedError
+
 
 def return_token_fields():
     return {
@@ -37,65 +52,198 @@ def return_token_fields():
     }
 
 
-def create_blueprint(storage: Storage) -> Tuple[Blueprint, Callable]:
+def create_blueprint(storage: Storage, hashingPolicy: Optional[HashingPolicy] = None,
+                     usernameFilter: Optional[UsernameFilter] = None,
+                     audit: Optional[Callable] = None,
+                     isAdmin: Optional[Callable] = None,
+                     tokenCacheSize: int = 10000) -> Tuple[Blueprint, Callable]:
     '''
-    Returns the blueprint and authorization decorator for token based authentication
+    Returns the blueprint and authorization decorator for token based authentication.
+    If isAdmin is given, users for which it returns True can list users and refresh tokens under /admin.
+    Up to tokenCacheSize verified access tokens are remembered, 0 disables the cache.
     '''
-    bp, _ = authentication_blueprint(
-        Authentication(storage.find_password_hash, storage.store_user, _TokenGenerator())
+    bp, ns = authentication_blueprint(
+        Authentication(
+            storage.find_password_hash, storage.store_user, _TokenGenerator(storage),
+            implemented(storage, 'update_password_hash'), implemented(storage, 'iter_usernames'),
+            storage.store_users
+        ),
+        hashingPolicy, usernameFilter, audit
     )
-    return bp, PermissionDecorator(_UserGetter(storage))
+    cache = VerifiedTokenCache(tokenCacheSize) if tokenCacheSize else None
+    get_user = _UserGetter(storage, cache)
+    if implemented(storage, 'remove_user_refresh_tokens'):
+        add_logout_all_route(ns, storage, get_user, audit)
+    add_introspection_route(ns, cache)
+    permission_required = PermissionDecorator(get_user)
+    if isAdmin:
+        listings = {}
+        if implemented(storage, 'iter_usernames'):
+            listings['users'] = user_listing(storage.iter_usernames)
+        if implemented(storage, 'iter_refresh_tokens'):
+            listings['refresh_tokens'] = _refresh_token_listing(storage)
+        add_admin_routes(ns, permission_required, isAdmin, listings)
+    return bp, permission_required
+
+
+def _refresh_token_listing(storage):
+    def iterate(after):
+        for userAgentHash, username in storage.iter_refresh_tokens(after):
+            yield userAgentHash, {'userAgentHash': userAgentHash, 'username': username}
+    return iterate
+
+
+def user_agent_hash(username):
+    userAgent = request.headers.get('User-Agent', '')
+    return hashlib.sha256(f'{username}\0{userAgent}'.encode()).hexdigest()
 
 
 class _TokenGenerator:
-    def __init__(self) -> None:
-        pass
+    def __init__(self, storage) -> None:
+        self._storage = storage
 
     def __call__(self, username):
-        accessPayload = {
-            'uid': username,
-            'exp': datetime.datetime.utcnow() +
-            datetime.timedelta(seconds=current_app.config['ACCESS_EXP_SECS']),
-            'iat': datetime.datetime.utcnow()
-        }
-        accessTokenEncoded = jwt.encode(
-            accessPayload,
-            current_app.config['SECRET_KEY'],
-            algorithm='HS256'
-        )
-        refreshPayload = {
-            'uid': username,
-            'exp': datetime.datetime.utcnow()
-            + datetime.timedelta(seconds=current_app.config['REFRESH_EXP_SECS']),
-            'iat': datetime.datetime.utcnow()
-        }
-        refreshTokenEncoded = jwt.encode(
-            refreshPayload,
-            current_app.config['SECRET_KEY'],
-            algorithm='HS256'
-        )
+        config = current_app.config
+        codec = current_codec()
+        now = int(time.time())
+        accessTokenEncoded = codec.encode(username, now, now + config['ACCESS_EXP_SECS'])
+        refreshTokenEncoded = codec.encode(username, now, now + config['REFRESH_EXP_SECS'], REFRESH_TOKEN)
+        self._storage.store_refresh_token(username, refreshTokenEncoded, user_agent_hash(username))
         return {'access_token': accessTokenEncoded, 'refresh_token': refreshTokenEncoded}
 
 
+class VerifiedTokenCache:
+    '''
+    Bounded LRU of access tokens whose signature was already verified, so repeated
+    requests with the same token skip decoding. Entries are dropped when the codec or secret changes.
+    '''
+    def __init__(self, size: int = 10000) -> None:
+        self._size = size
+        self._entries: OrderedDict = OrderedDict()
+        self._codec = None
+        self._lock = threading.Lock()
+
+    def get(self, token, codec) -> Optional[Tuple[str, int]]:
+        with self._lock:
+            if codec is not self._codec:
+                return None
+            entry = self._entries.get(token)
+            if entry is not None:
+                self._entries.move_to_end(token)
+            return entry
+
+    def put(self, token, codec, uid, exp) -> None:
+        with self._lock:
+            if codec is not self._codec:
+                self._entries.clear()
+                self._codec = codec
+            self._entries[token] = (uid, exp)
+            if len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+
+def decode_access_token(accessToken: str, cache: Optional[VerifiedTokenCache] = None) -> Tuple[str, int]:
+    '''
+    Returns the uid and expiry timestamp of a valid access token.
+    Raises jwt.ExpiredSignatureError or jwt.InvalidTokenError otherwise, also for refresh tokens.
+    '''
+    codec = current_codec()
+    verified = cache.get(accessToken, codec) if cache is not None else None
+    if verified is not None:
+        if verified[1] <= time.time():
+            raise jwt.ExpiredSignatureError('Signature has expired')
+        return verified
+    uid, exp = codec.decode(accessToken)
+    if cache is not None:
+        cache.put(accessToken, codec, uid, exp)
+    return uid, exp
+
+
 class _UserGetter:
-    def __init__(self, storage) -> None:
+    def __init__(self, storage, cache: Optional[VerifiedTokenCache] = None) -> None:
         self._storage = storage
+        self._cache = cache
 
     def __call__(self):
         authHeader = request.headers.get('Authorization')
-        if authHeader:
-            try:
-                accessToken = authHeader.split(' ')[1]
-                try:
-                    token = jwt.decode(accessToken, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-                    return token['uid']
-                except jwt.ExpiredSignatureError as e:
-                    abort(HTTPStatus.FORBIDDEN, e)
-                except (jwt.DecodeError, jwt.InvalidTokenError) as e:
-                    raise e
-                except Exception:
-                    abort(HTTPStatus.FORBIDDEN, 'Unknown token error')
-            except IndexError:
-                raise jwt.InvalidTokenError
-        else:
+        if not authHeader:
             abort(HTTPStatus.FORBIDDEN, 'Token required')
+        parts = authHeader.split(' ')
+        if len(parts) != 2:
+            abort(HTTPStatus.UNAUTHORIZED, 'Invalid token')
+        try:
+            uid, _ = decode_access_token(parts[1], self._cache)
+            return uid
+        except jwt.ExpiredSignatureError:
+            abort(HTTPStatus.UNAUTHORIZED, 'Token expired')
+        except jwt.InvalidTokenError:
+            abort(HTTPStatus.UNAUTHORIZED, 'Invalid token')
+
+
+def revoke_user(storage: Storage, username) -> int:
+    '''
+    Removes all refresh tokens of the user, e.g. after a password change.
+    Access tokens stay valid until they expire.
+    '''
+    return storage.remove_user_refresh_tokens(username)
+
+
+def add_logout_all_route(ns, storage: Storage, get_user, audit=None):
+    @ns.route('/logout/all')
+    class LogoutAll(Resource):
+        @ns.response(HTTPStatus.OK, 'Success')
+        @ns.response(HTTPStatus.FORBIDDEN, 'Authorization missing')
+        @ns.response(HTTPStatus.MOVED_PERMANENTLY, 'Insecure connection')
+        def post(self):
+            '''
+            Revokes all refresh tokens of the current user
+            '''
+            if not request.is_secure:
+                url = request.url.replace('http://', 'https://', 1)
+                return redirect(url, code=HTTPStatus.MOVED_PERMANENTLY)
+            username = get_user()
+            if not username:
+                abort(HTTPStatus.FORBIDDEN, 'Not allowed')
+            removed = revoke_user(storage, username)
+            auditlog.record(audit, auditlog.LOGOUT_ALL, username)
+            return {'removed': removed}
+
+
+def introspection_fields():
+    return {
+        'tokens': fields.List(fields.String, required=True)
+    }
+
+
+def add_introspection_route(ns, cache: Optional[VerifiedTokenCache] = None):
+    @ns.route('/introspect')
+    class Introspect(Resource):
+        @ns.expect(ns.model('Introspection', introspection_fields()), validate=True)
+        @ns.response(HTTPStatus.OK, 'Success')
+        @ns.response(HTTPStatus.FORBIDDEN, 'Introspection key missing')
+        @ns.response(HTTPStatus.MOVED_PERMANENTLY, 'Insecure connection')
+        def post(self):
+            '''
+            Validates a batch of access tokens, for API gateways. Requires the INTROSPECTION_KEY
+            from the app config in the X-Introspection-Key header.
+            '''
+            if not request.is_secure:
+                url = request.url.replace('http://', 'https://', 1)
+                return redirect(url, code=HTTPStatus.MOVED_PERMANENTLY)
+            key = current_app.config.get('INTROSPECTION_KEY')
+            if not key or not hmac.compare_digest(request.headers.get('X-Introspection-Key', ''), key):
+                abort(HTTPStatus.FORBIDDEN, 'Introspection key missing')
+            tokens = ns.payload['tokens']
+            if len(tokens) > current_app.config.get('INTROSPECTION_MAX_TOKENS', 100):
+                abort(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'Too many tokens')
+            return {'results': [_introspect(token, cache) for token in tokens]}
+
+
+def _introspect(accessToken, cache):
+    try:
+        uid, exp = decode_access_token(accessToken, cache)
+        return {'active': True, 'uid': uid, 'exp': exp}
+    except jwt.ExpiredSignatureError:
+        return {'active': False, 'error': 'expired'}
+    except jwt.InvalidTokenError:
+        return {'active': False, 'error': 'invalid'}
@@ -1,11 +1,66 @@
-from typing import Callable, Dict, NamedTuple, Optional
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from abc import ABC, abstractmethod
 
 
 Username = str
 PasswordHash = str
 
 
+def optional(method):
+    '''
+    Marks a default storage method that the blueprints only use when a storage overrides it
+    '''
+    method.isOptional = True
+    return method
+
+
+def implemented(storage, name: str) -> Optional[Callable]:
+    '''
+    Returns the storage's method, or None if the storage keeps the optional default
+    '''
+    method = getattr(storage, name, None)
+    return None if method is None or getattr(method, 'isOptional', False) else method
+
+
+class UserStorage(ABC):
+    @abstractmethod
+    def store_user(self, username: str, passwordHash: str) -> None:
+        ...
+
+    @abstractmethod
+    def find_password_hash(self, username):
+        ...
+
+    @optional
+    def update_password_hash(self, username: str, passwordHash: str) -> None:
+        '''
+        Replaces the hash of an existing user. Outdated hashes are only replaced on login
+        when a storage overrides it.
+        '''
+        raise NotImplementedError
+
+    def store_users(self, users: Iterable[Tuple[Username, PasswordHash]]) -> int:
+        '''
+        Stores a batch of new users and returns how many were stored, used by the user import.
+        Override it to write the whole batch in a single call.
+        '''
+        return sum(self.store_user(username, passwordHash) is not False for username, passwordHash in users)
+
+    @optional
+    def iter_usernames(self, after: Optional[Username] = None) -> Iterator[Username]:
+        '''
+        Yields registered usernames in ascending order, starting after the given username.
+        Used to build the username filter and by the admin listings, so it should stream
+        from the storage rather than load all users at once.
+        '''
+        raise NotImplementedError
+
+
 class Authentication(NamedTuple):
     find_password_hash: Callable[[Username], Optional[PasswordHash]]
     store_user: Callable[[Username, PasswordHash], None]
     generate_session_info: Callable[[Username], Optional[Dict]]
+    update_password_hash: Optional[Callable[[Username, PasswordHash], None]] = None
+    iter_usernames: Optional[Callable[..., Iterator[Username]]] = None
+    store_users: Optional[Callable[[Iterable[Tuple[Username, PasswordHash]]], int]] = None
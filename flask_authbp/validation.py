@@ -0,0 +1,78 @@
+from http import HTTPStatus
+from typing import Tuple
+from flask import abort, current_app, request
+
+import json
+
+
+MAX_CREDENTIALS_BYTES = 4096
+MAX_USERNAME_LENGTH = 128
+MAX_PASSWORD_LENGTH = 128
+PASSWORD_LENGTH = (6, 64)
+
+_USERNAME_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789._')
+_PASSWORD_SYMBOLS = frozenset('!@#$%_')
+_ASCII_UPPER = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZ')
+_ASCII_LOWER = frozenset('abcdefghijklmnopqrstuvwxyz')
+
+
+def name_valid(username):
+    '''
+    1-128 symbols, can contain A-Z, a-z, 0-9, _ (_ can not be at the begin/end and can not go in a row (__))
+    '''
+    if not 0 < len(username) <= MAX_USERNAME_LENGTH or username[0] == '_' or username[-1] == '_':
+        return False
+    previous = ''
+    for c in username:
+        if c not in _USERNAME_CHARS or (c == '_' and previous == '_'):
+            return False
+        previous = c
+    return True
+
+
+def pass_valid(password):
+    '''
+    6-64 symbols, required upper and lower case letters. Can contain !@#$%_  .
+    '''
+    if not PASSWORD_LENGTH[0] <= len(password) <= PASSWORD_LENGTH[1]:
+        return False
+    digit = upper = lower = False
+    for c in password:
+        if c in _ASCII_UPPER:
+            upper = True
+        elif c in _ASCII_LOWER:
+            lower = True
+        elif c.isdecimal():
+            digit = True
+        elif c not in _PASSWORD_SYMBOLS and not c.isalnum():
+            return False
+    return digit and upper and lower
+
+
+def read_credentials() -> Tuple[str, str]:
+    '''
+    Returns the username and password from the JSON body. Payloads whose Content-Length
+    exceeds MAX_CREDENTIALS_BYTES (configurable in the app config) are rejected before the
+    body is read, malformed ones before any storage or hashing work. Bodies without a
+    Content-Length are bounded by Flask's MAX_CONTENT_LENGTH.
+    '''
+    maxBytes = current_app.config.get('MAX_CREDENTIALS_BYTES', MAX_CREDENTIALS_BYTES)
+    if request.content_length is not None and request.content_length > maxBytes:
+        abort(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'Payload too large')
+    data = request.get_data(cache=True)
+    if len(data) > maxBytes:
+        abort(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'Payload too large')
+    try:
+        payload = json.loads(data)
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        abort(HTTPStatus.BAD_REQUEST, 'Input payload validation failed')
+    username, password = payload.get('username'), payload.get('password')
+    if not isinstance(username, str) or not isinstance(password, str):
+        abort(HTTPStatus.BAD_REQUEST, 'Input payload validation failed')
+    return username, password
+
+
+def credentials_within_limits(username: str, password: str) -> bool:
+    return len(username) <= MAX_USERNAME_LENGTH and len(password) <= MAX_PASSWORD_LENGTH
@@ -0,0 +1,74 @@
+from http import HTTPStatus
+import base64
+import json
+import unittest
+
+from tests.utility import SbTestStorage, create_sb_app
+
+
+class TestAdmin(unittest.TestCase):
+    def setUp(self):
+        self.app = create_sb_app('sb_admin_app', isAdmin=lambda user: user == 'AdminUser')
+        self.usernames = ['AdminUser'] + [f'ListedUser{i}' for i in range(4)]
+        for username in self.usernames:
+            self.app.test_client().post('/register', json={'username': username, 'password': f'{username}1234!'})
+        self.adminClient = self._login('AdminUser')
+
+    def _login(self, username):
+        testClient = self.app.test_client()
+        response = testClient.post('/login', json={'username': username, 'password': f'{username}1234!'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return testClient
+
+    def test_paginated_users(self):
+        listed, cursor = [], None
+        while True:
+            query = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+            response = self.adminClient.get('/admin/users', query_string=query)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertLessEqual(len(response.json['items']), 2)
+            listed.extend(item['username'] for item in response.json['items'])
+            cursor = response.json['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(listed, sorted(self.usernames))
+
+    def test_streamed_sessions(self):
+        self._login('ListedUser0')
+        response = self.adminClient.get('/admin/sessions.jsonl')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        sessions = [json.loads(line) for line in response.data.decode().splitlines()]
+        self.assertEqual(sorted(session['username'] for session in sessions), ['AdminUser', 'ListedUser0'])
+        self.assertTrue(all(len(session['session']) == 16 for session in sessions))
+
+    def test_session_cursors_are_opaque(self):
+        storage = SbTestStorage()
+        app = create_sb_app('sb_admin_cursor_app', storage=storage, isAdmin=lambda user: True)
+        app.test_client().post('/register', json={'username': 'CursorUser', 'password': 'CursorUser1234!'})
+        adminClient = app.test_client()
+        for _ in range(4):
+            adminClient.post('/login', json={'username': 'CursorUser', 'password': 'CursorUser1234!'})
+        listed, cursors, cursor = 0, [], None
+        while True:
+            query = {'limit': 1, **({'cursor': cursor} if cursor else {})}
+            response = adminClient.get('/admin/sessions', query_string=query)
+            listed += len(response.json['items'])
+            cursor = response.json['next_cursor']
+            if not cursor:
+                break
+            cursors.append(cursor)
+        self.assertEqual(listed, 4)
+        for cursor in cursors:
+            decoded = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            for sessionId in storage._session:
+                self.assertNotIn(sessionId, cursor)
+                self.assertNotIn(sessionId.encode(), decoded)
+
+    def test_rejected(self):
+        userClient = self._login('ListedUser1')
+        self.assertEqual(userClient.get('/admin/users').status_code, HTTPStatus.FORBIDDEN)
+        self.assertEqual(userClient.get('/admin/sessions.jsonl').status_code, HTTPStatus.FORBIDDEN)
+        self.assertEqual(self.app.test_client().get('/admin/users').status_code, HTTPStatus.FORBIDDEN)
+        response = self.adminClient.get('/admin/users', query_string={'cursor': 'forged'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
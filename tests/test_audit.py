@@ -0,0 +1,80 @@
+from http import HTTPStatus
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from flask_authbp import audit
+from flask_authbp.audit import AuditEvent, AuditLog, FileSink, SqlSink
+from tests.utility import create_sb_app
+
+
+class TestAuditLog(unittest.TestCase):
+    def test_auth_events(self):
+        batches = []
+        auditLog = AuditLog(batches.append, batchSize=100, flushInterval=60)
+        testClient = create_sb_app('sb_audit_app', audit=auditLog).test_client()
+        testUser = {'username': 'AuditUser', 'password': 'AuditUser1234!'}
+        testClient.post('/register', json=testUser)
+        testClient.post('/login', json={'username': 'AuditUser', 'password': 'Wrong1234!'})
+        testClient.post('/login', json=testUser)
+        self.assertEqual(testClient.post('/logout').status_code, HTTPStatus.OK)
+        self.assertEqual(batches, [])
+        auditLog.close()
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(
+            [(event.kind, event.username) for event in batches[0]],
+            [(audit.REGISTER, 'AuditUser'), (audit.LOGIN_FAILED, 'AuditUser'),
+             (audit.LOGIN, 'AuditUser'), (audit.LOGOUT, 'AuditUser')]
+        )
+
+    def test_batches_by_size_and_time(self):
+        batches = []
+        auditLog = AuditLog(batches.append, batchSize=3, flushInterval=0.1)
+        for i in range(7):
+            auditLog.emit(AuditEvent(audit.LOGIN, f'User{i}', time.time(), None))
+        time.sleep(0.3)
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+        self.assertEqual(auditLog.stats()['written'], 7)
+        auditLog.close()
+
+    def test_overflow(self):
+        release = threading.Event()
+        batches = []
+
+        def slow_sink(batch):
+            release.wait()
+            batches.append(batch)
+
+        auditLog = AuditLog(slow_sink, maxQueueSize=2, batchSize=1, flushInterval=60, overflow='drop_oldest')
+        auditLog.emit(AuditEvent(audit.LOGIN, 'Writing', 0.0, None))
+        time.sleep(0.1)
+        for username in ('First', 'Second', 'Third'):
+            auditLog.emit(AuditEvent(audit.LOGIN, username, 0.0, None))
+        self.assertEqual(auditLog.stats()['dropped'], 1)
+        release.set()
+        auditLog.close()
+        self.assertEqual([batch[0].username for batch in batches], ['Writing', 'Second', 'Third'])
+
+    def test_sinks(self):
+        events = [
+            AuditEvent(audit.LOGIN, 'SinkUser', 1.0, '127.0.0.1'),
+            AuditEvent(audit.LOGOUT, 'SinkUser', 2.0, None)
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'audit.jsonl')
+            FileSink(path)(events)
+            with open(path) as f:
+                self.assertEqual([json.loads(line)['kind'] for line in f], [audit.LOGIN, audit.LOGOUT])
+
+            database = os.path.join(directory, 'audit.db')
+            connection = sqlite3.connect(database)
+            connection.execute('CREATE TABLE auth_audit (kind TEXT, username TEXT, timestamp REAL, remoteAddr TEXT)')
+            connection.close()
+            SqlSink(lambda: sqlite3.connect(database))(events)
+            connection = sqlite3.connect(database)
+            self.assertEqual(connection.execute('SELECT COUNT(*) FROM auth_audit').fetchone()[0], 2)
+            connection.close()
@@ -0,0 +1,91 @@
+import unittest
+
+from flask_authbp.bloom import UsernameFilter
+from flask_authbp.messages import LoginStatus, RegistrationStatus
+from flask_authbp.sessionbased import Storage
+from tests.utility import CountingStorage, SbTestStorage, create_sb_app
+
+
+class TestUsernameFilter(unittest.TestCase):
+    def test_no_false_negatives(self):
+        usernameFilter = UsernameFilter(capacity=1000, falsePositiveRate=0.01)
+        usernames = [f'User{i}' for i in range(1000)]
+        usernameFilter.update(usernames)
+        self.assertTrue(all(username in usernameFilter for username in usernames))
+        falsePositives = sum(f'Other{i}' in usernameFilter for i in range(10000))
+        self.assertLess(falsePositives / 10000, 0.03)
+        stats = usernameFilter.stats()
+        self.assertEqual(stats['count'], 1000)
+        self.assertEqual(stats['memoryBytes'], (usernameFilter.bits + 7) // 8)
+        self.assertAlmostEqual(stats['estimatedFalsePositiveRate'], 0.01, delta=0.005)
+
+    def test_unknown_login_skips_storage(self):
+        storage = CountingStorage()
+        storage.store_user('ExistingUser', 'hash')
+        usernameFilter = UsernameFilter(capacity=100, missLookupRate=0, missLookupBurst=0)
+        testClient = create_sb_app('sb_filter_app', storage=storage, usernameFilter=usernameFilter).test_client()
+        self.assertNotIn('ExistingUser', usernameFilter)
+
+        response = testClient.post('/login', json={'username': 'UnknownUser', 'password': 'Unknown1234!'})
+        self.assertIn('ExistingUser', usernameFilter)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json['message'], LoginStatus.WrongUsernameOrPassword)
+        self.assertEqual(storage.lookups, 0)
+
+        testUser = {'username': 'FilteredUser', 'password': 'FilteredUser1234!'}
+        self.assertEqual(testClient.post('/register', json=testUser).status_code, 200)
+        self.assertEqual(storage.lookups, 1)
+        self.assertEqual(testClient.post('/login', json=testUser).status_code, 200)
+        self.assertEqual(storage.lookups, 2)
+        self.assertEqual(testClient.post('/register', json=testUser).status_code, 400)
+
+    def test_filter_requires_iter_usernames(self):
+        class NoIterStorage(SbTestStorage):
+            iter_usernames = Storage.iter_usernames
+
+        with self.assertRaises(TypeError):
+            create_sb_app('sb_filter_no_iter_app', storage=NoIterStorage(), usernameFilter=UsernameFilter(100))
+
+    def test_built_on_first_login(self):
+        class UncreatedStorage(SbTestStorage):
+            created = False
+
+            def iter_usernames(self, after=None):
+                if not self.created:
+                    raise RuntimeError('no such table')
+                return super().iter_usernames(after)
+
+        storage = UncreatedStorage()
+        testClient = create_sb_app(
+            'sb_filter_lazy_app', storage=storage, usernameFilter=UsernameFilter(100)
+        ).test_client()
+        storage.created = True
+        testUser = {'username': 'LazyUser', 'password': 'LazyUser1234!'}
+        self.assertEqual(testClient.post('/register', json=testUser).status_code, 200)
+        self.assertEqual(testClient.post('/login', json=testUser).status_code, 200)
+
+    def test_register_checks_storage_across_workers(self):
+        storage = SbTestStorage()
+        firstWorker = create_sb_app('sb_filter_first_app', storage=storage, usernameFilter=UsernameFilter(100))
+        secondWorker = create_sb_app('sb_filter_second_app', storage=storage, usernameFilter=UsernameFilter(100))
+        victim = {'username': 'VictimUser', 'password': 'VictimUser1234!'}
+        attacker = {'username': 'VictimUser', 'password': 'Attacker1234!'}
+        secondClient = secondWorker.test_client()
+        self.assertEqual(secondClient.post('/login', json=victim).status_code, 401)
+        self.assertEqual(firstWorker.test_client().post('/register', json=victim).status_code, 200)
+
+        response = secondWorker.test_client().post('/register', json=attacker)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json['message'], RegistrationStatus.UserExists)
+        self.assertEqual(firstWorker.test_client().post('/login', json=victim).status_code, 200)
+        self.assertEqual(secondClient.post('/login', json=victim).status_code, 200)
+        self.assertEqual(secondClient.post('/login', json=attacker).status_code, 401)
+
+    def test_miss_lookups_are_rate_limited(self):
+        storage = CountingStorage()
+        usernameFilter = UsernameFilter(capacity=100, missLookupRate=0, missLookupBurst=2)
+        testClient = create_sb_app('sb_filter_miss_app', storage=storage, usernameFilter=usernameFilter).test_client()
+        for _ in range(5):
+            response = testClient.post('/login', json={'username': 'UnknownUser', 'password': 'Unknown1234!'})
+            self.assertEqual(response.status_code, 401)
+        self.assertEqual(storage.lookups, 2)
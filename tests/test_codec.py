@@ -0,0 +1,47 @@
+import time
+import unittest
+
+import jwt
+from parameterized import parameterized  # type: ignore
+
+from flask_authbp.codec import REFRESH_TOKEN, CompactCodec, JwtCodec
+from tests.utility import create_jwt_app
+
+
+class TestCodec(unittest.TestCase):
+    @parameterized.expand([(JwtCodec,), (CompactCodec,)])
+    def test_round_trip(self, codecType):
+        codec = codecType('my secret')
+        now = int(time.time())
+        token = codec.encode('CodecUser', now, now + 60)
+        self.assertEqual(codec.decode(token), ('CodecUser', now + 60))
+        self.assertRaises(jwt.InvalidTokenError, codecType('other secret').decode, token)
+        self.assertRaises(jwt.InvalidTokenError, codec.decode, token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB'))
+        expired = codec.encode('CodecUser', now - 120, now - 60)
+        self.assertRaises(jwt.ExpiredSignatureError, codec.decode, expired)
+        refresh = codec.encode('CodecUser', now, now + 60, REFRESH_TOKEN)
+        self.assertRaises(jwt.InvalidTokenError, codec.decode, refresh)
+        self.assertEqual(codec.decode(refresh, REFRESH_TOKEN), ('CodecUser', now + 60))
+
+    def test_jwt_compatible(self):
+        now = int(time.time())
+        token = JwtCodec('my secret').encode('CodecUser', now, now + 60)
+        self.assertEqual(jwt.decode(token, 'my secret', algorithms=['HS256'])['uid'], 'CodecUser')
+        legacy = jwt.encode({'uid': 'CodecUser', 'exp': now + 60, 'iat': now}, 'my secret', algorithm='HS256')
+        self.assertRaises(jwt.InvalidTokenError, JwtCodec('my secret').decode, legacy)
+        self.assertEqual(JwtCodec('my secret').decode(legacy, None), ('CodecUser', now + 60))
+
+    def test_compact_is_smaller(self):
+        now = int(time.time())
+        jwtToken = JwtCodec('my secret').encode('CodecUser', now, now + 60)
+        compactToken = CompactCodec('my secret').encode('CodecUser', now, now + 60)
+        self.assertLess(len(compactToken) * 2, len(jwtToken))
+
+    def test_compact_app(self):
+        testClient = create_jwt_app('jwt_compact_app', tokenCodec='compact').test_client()
+        testUser = {'username': 'CompactUser', 'password': 'CompactUser1234!'}
+        testClient.post('/register', json=testUser)
+        accessToken = testClient.post('/login', json=testUser).json['access_token']
+        self.assertNotIn('.', accessToken)
+        authorization = {'Authorization': f'access_token {accessToken}'}
+        self.assertEqual(testClient.post('/testing/resource', headers=authorization).status_code, 200)
@@ -0,0 +1,74 @@
+import unittest
+from unittest import mock
+
+from flask_authbp import hashing
+from flask_authbp.hashing import HashingPolicy, calibrate
+from flask_authbp.sessionbased import Storage
+from tests.utility import SbTestStorage, create_sb_app
+
+
+class InsertOnlyStorage(SbTestStorage):
+    update_password_hash = Storage.update_password_hash
+
+    def store_user(self, username, passwordHash):
+        if username in self._passwordHashes:
+            raise ValueError('User exists')
+        return super().store_user(username, passwordHash)
+
+
+class TestHashing(unittest.TestCase):
+    def test_verify(self):
+        for method in ('pbkdf2:sha256:1000', 'scrypt:1024:8:1'):
+            policy = HashingPolicy(method)
+            passwordHash = policy.hash('Secret1234!')
+            self.assertTrue(passwordHash.startswith(method + '$'))
+            self.assertTrue(policy.verify(passwordHash, 'Secret1234!'))
+            self.assertFalse(policy.verify(passwordHash, 'Wrong1234!'))
+            self.assertFalse(policy.needs_rehash(passwordHash))
+
+    def test_needs_rehash(self):
+        cheapHash = HashingPolicy('pbkdf2:sha256:1000').hash('Secret1234!')
+        self.assertTrue(HashingPolicy('pbkdf2:sha256:2000').needs_rehash(cheapHash))
+        self.assertTrue(HashingPolicy('scrypt:1024:8:1').needs_rehash(cheapHash))
+        self.assertTrue(HashingPolicy('scrypt:1024:8:1').verify(cheapHash, 'Secret1234!'))
+        defaultCostPolicy = HashingPolicy('pbkdf2:sha256')
+        self.assertFalse(defaultCostPolicy.needs_rehash(defaultCostPolicy.hash('Secret1234!')))
+
+    def test_argon2_hash_without_argon2(self):
+        argon2Hash = '$argon2id$v=19$m=65536,t=3,p=4$c2FsdHNhbHQ$aGFzaGhhc2hoYXNoaGFzaA'
+        with mock.patch.object(hashing, 'argon2', None):
+            with self.assertRaisesRegex(ImportError, 'argon2-cffi'):
+                HashingPolicy().verify(argon2Hash, 'Secret1234!')
+
+    def test_rehash_on_login(self):
+        storage = SbTestStorage()
+        testUser = {'username': 'RehashUser', 'password': 'RehashUser1234!'}
+        oldApp = create_sb_app('sb_old_hash_app', storage=storage, hashingPolicy=HashingPolicy('pbkdf2:sha256:1000'))
+        self.assertEqual(oldApp.test_client().post('/register', json=testUser).status_code, 200)
+        oldHash = storage.find_password_hash('RehashUser')
+
+        newApp = create_sb_app('sb_new_hash_app', storage=storage, hashingPolicy=HashingPolicy('scrypt:1024:8:1'))
+        testClient = newApp.test_client()
+        self.assertEqual(testClient.post('/login', json=testUser).status_code, 200)
+        newHash = storage.find_password_hash('RehashUser')
+        self.assertNotEqual(oldHash, newHash)
+        self.assertTrue(newHash.startswith('scrypt:1024:8:1$'))
+        self.assertEqual(testClient.post('/login', json=testUser).status_code, 200)
+        self.assertEqual(storage.find_password_hash('RehashUser'), newHash)
+
+    def test_no_rehash_without_update(self):
+        storage = InsertOnlyStorage()
+        testUser = {'username': 'InsertOnlyUser', 'password': 'InsertOnlyUser1234!'}
+        oldApp = create_sb_app('sb_insert_only_app', storage=storage, hashingPolicy=HashingPolicy('pbkdf2:sha256:1000'))
+        self.assertEqual(oldApp.test_client().post('/register', json=testUser).status_code, 200)
+        oldHash = storage.find_password_hash('InsertOnlyUser')
+
+        newApp = create_sb_app('sb_insert_only_new_app', storage=storage,
+                               hashingPolicy=HashingPolicy('scrypt:1024:8:1'))
+        self.assertEqual(newApp.test_client().post('/login', json=testUser).status_code, 200)
+        self.assertEqual(storage.find_password_hash('InsertOnlyUser'), oldHash)
+
+    def test_calibrate(self):
+        method = calibrate('pbkdf2', 0.005)
+        self.assertTrue(method.startswith('pbkdf2:sha256:'))
+        self.assertGreaterEqual(int(method.rsplit(':', 1)[1]), 1000)
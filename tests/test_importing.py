@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+import unittest
+
+from flask_authbp.hashing import HashingPolicy
+from flask_authbp.importing import MALFORMED_RECORD, import_users
+from flask_authbp.memory import MemorySessionStorage
+from flask_authbp.messages import RegistrationStatus
+from tests.utility import create_sb_app
+
+
+class TestImportUsers(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.policy = HashingPolicy('pbkdf2:sha256:1000')
+        prehashed = self.policy.hash('Prehashed1234!')
+        self.csvPath = os.path.join(self.directory, 'users.csv')
+        with open(self.csvPath, 'w') as f:
+            f.write('username,password,password_hash\n')
+            for i in range(5):
+                f.write(f'CsvUser{i},CsvUser{i}1234!,\n')
+            f.write('_Invalid,Invalid1234!,\n')
+            f.write(f'PrehashedUser,,{prehashed}\n')
+            f.write('PlaintextUser,,Plaintext1234!\n')
+
+    def test_import_and_login(self):
+        storage = MemorySessionStorage()
+        rejected = []
+        report = import_users(
+            self.csvPath, storage.store_users, self.policy, workers=2, batchSize=3,
+            rejected=lambda record, reason: rejected.append((record.line, reason))
+        )
+        self.assertEqual(report, (8, 6, 0, 2))
+        self.assertEqual(rejected, [
+            (7, RegistrationStatus.InvalidUsername), (9, RegistrationStatus.InvalidPasswordHash)
+        ])
+
+        testClient = create_sb_app('sb_import_app', storage=storage, hashingPolicy=self.policy).test_client()
+        for username, password in (('CsvUser3', 'CsvUser31234!'), ('PrehashedUser', 'Prehashed1234!')):
+            response = testClient.post('/login', json={'username': username, 'password': password})
+            self.assertEqual(response.status_code, 200)
+
+    def test_resume(self):
+        path = os.path.join(self.directory, 'users.jsonl')
+        with open(path, 'w') as f:
+            for i in range(10):
+                f.write(json.dumps({'username': f'JsonUser{i}', 'password': f'JsonUser{i}1234!'}) + '\n')
+        checkpoint = os.path.join(self.directory, 'import.checkpoint')
+        storage = MemorySessionStorage()
+        batches = []
+
+        def failing_store_users(users):
+            if len(batches) == 2:
+                raise ConnectionError
+            batches.append([username for username, _ in users])
+            return storage.store_users(users)
+
+        with self.assertRaises(ConnectionError):
+            import_users(path, failing_store_users, self.policy, workers=0, batchSize=3, checkpoint=checkpoint)
+        batches.append('resumed')
+        report = import_users(path, failing_store_users, self.policy, workers=0, batchSize=3, checkpoint=checkpoint)
+        self.assertEqual(report, (10, 10, 0, 0))
+        self.assertEqual(batches[3], ['JsonUser6', 'JsonUser7', 'JsonUser8'])
+        self.assertEqual(len(list(storage.iter_usernames())), 10)
+
+    def test_malformed_records(self):
+        path = os.path.join(self.directory, 'malformed.jsonl')
+        with open(path, 'w') as f:
+            f.write(json.dumps({'username': 'GoodUser0', 'password': 'GoodUser01234!'}) + '\n')
+            f.write('not json\n')
+            f.write('["GoodUser", "GoodUser1234!"]\n')
+            f.write('\n')
+            f.write(json.dumps({'username': 5, 'password': 'GoodUser1234!'}) + '\n')
+            f.write(json.dumps({'username': 'NumberUser', 'password': 123}) + '\n')
+            f.write(json.dumps({'username': 'GoodUser1', 'password': 'GoodUser11234!'}) + '\n')
+        storage = MemorySessionStorage()
+        rejected = []
+        report = import_users(
+            path, storage.store_users, self.policy, workers=0, batchSize=2,
+            rejected=lambda record, reason: rejected.append((record.line, reason))
+        )
+        self.assertEqual(report, (6, 2, 0, 4))
+        self.assertEqual(rejected, [(line, MALFORMED_RECORD) for line in (2, 3, 5, 6)])
+        self.assertEqual(list(storage.iter_usernames()), ['GoodUser0', 'GoodUser1'])
+
+    def test_cli(self):
+        app = create_sb_app('sb_import_cli_app')
+        result = app.test_cli_runner().invoke(args=['authbp', 'import-users', self.csvPath, '--workers', '0'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('Imported 6 of 8 users', result.output)
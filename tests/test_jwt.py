@@ -30,3 +30,48 @@ class TestJwt(unittest.TestCase):
         testingResponse = testClient.post(
             '/testing/resource', json=testData, headers=authorization)
         self.assertEqual(testingResponse.status_code, 401)
+
+    def test_logout_everywhere(self):
+        testClient = create_jwt_app('jwt_logout_all').test_client()
+        testUser = {
+            'username': 'EverywhereTokenUser',
+            'password': 'EverywhereTokenUser1234!'
+        }
+        self.assertEqual(testClient.post('/register', json=testUser).status_code, 200)
+        testClient.post('/login', json=testUser, headers={'User-Agent': 'phone'})
+        loginResponse = testClient.post('/login', json=testUser, headers={'User-Agent': 'laptop'})
+        authorization = {'Authorization': f'access_token {loginResponse.json["access_token"]}'}
+        logoutResponse = testClient.post('/logout/all', headers=authorization)
+        self.assertEqual(logoutResponse.status_code, 200)
+        self.assertEqual(logoutResponse.json['removed'], 2)
+        logoutResponse = testClient.post('/logout/all', headers=authorization)
+        self.assertEqual(logoutResponse.json['removed'], 0)
+
+    def test_introspection(self):
+        testClient = create_jwt_app('jwt_introspection', accessExpSecs=1).test_client()
+        testUser = {
+            'username': 'IntrospectedUser',
+            'password': 'IntrospectedUser1234!'
+        }
+        testClient.post('/register', json=testUser)
+        tokens = testClient.post('/login', json=testUser).json
+        accessToken = tokens['access_token']
+        gateway = {'X-Introspection-Key': 'gateway key'}
+        response = testClient.post(
+            '/introspect', json={'tokens': [accessToken, 'garbage', tokens['refresh_token']]}, headers=gateway
+        )
+        self.assertEqual(response.status_code, 200)
+        active, invalid, refresh = response.json['results']
+        self.assertEqual(refresh, {'active': False, 'error': 'invalid'})
+        authorization = {'Authorization': f"access_token {tokens['refresh_token']}"}
+        self.assertEqual(testClient.post('/testing/resource', headers=authorization).status_code, 401)
+        self.assertTrue(active['active'])
+        self.assertEqual(active['uid'], 'IntrospectedUser')
+        self.assertGreater(active['exp'], time.time())
+        self.assertEqual(invalid, {'active': False, 'error': 'invalid'})
+
+        time.sleep(2)
+        response = testClient.post('/introspect', json={'tokens': [accessToken]}, headers=gateway)
+        self.assertEqual(response.json['results'], [{'active': False, 'error': 'expired'}])
+        response = testClient.post('/introspect', json={'tokens': [accessToken]})
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,57 @@
+import socketserver
+import threading
+import unittest
+
+from werkzeug.serving import make_server
+
+from flask_authbp.cli import loadtest_command
+from flask_authbp.loadtest import run_loadtest
+from tests.utility import create_jwt_app, create_sb_app
+
+
+def _https_behind_proxy(wsgiApp):
+    def app(environ, start_response):
+        environ['wsgi.url_scheme'] = 'https'
+        return wsgiApp(environ, start_response)
+    return app
+
+
+class _GarbageHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.rfile.readline()
+        self.wfile.write(b'NOT HTTP\r\n\r\n')
+
+
+class TestLoadTest(unittest.TestCase):
+    def _serve(self, app):
+        app.wsgi_app = _https_behind_proxy(app.wsgi_app)
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.shutdown)
+        return f'http://127.0.0.1:{server.server_port}'
+
+    def test_session_based(self):
+        url = self._serve(create_sb_app('sb_loadtest_app'))
+        report = run_loadtest(url, users=3, requestsPerUser=5, loginRatio=0.2, workers=3, seed=1)
+        self.assertEqual(report.requests, 3 * 6)
+        self.assertEqual(report.errors, 0)
+        self.assertGreater(report.throughput, 0)
+        self.assertLessEqual(report.percentile('login', 50), report.percentile('login', 99))
+
+    def test_token_based_cli(self):
+        app = create_jwt_app('jwt_loadtest_app')
+        url = self._serve(app)
+        result = app.test_cli_runner().invoke(loadtest_command, [url, '--users', '2', '--requests', '3'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('errors:     0 ', result.output)
+        self.assertIn('p99=', result.output)
+
+    def test_broken_responses_count_as_status_0(self):
+        server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _GarbageHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        with self.assertRaisesRegex(RuntimeError, 'failed with status 0'):
+            run_loadtest(f'http://127.0.0.1:{server.server_address[1]}', users=2, requestsPerUser=2, workers=2)
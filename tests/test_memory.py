@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+import random
+import secrets
+import time
+import unittest
+
+from flask_authbp.memory import MemorySessionStorage, MemoryTokenStorage, _SortedKeys
+from tests.utility import create_sb_app
+
+
+class TestMemoryStorage(unittest.TestCase):
+    def test_sorted_keys(self):
+        rng = random.Random(34)
+        index, expected = _SortedKeys(chunkSize=4), set()
+        for _ in range(5000):
+            key = rng.randrange(300)
+            if rng.random() < 0.6:
+                index.add(key)
+                expected.add(key)
+            else:
+                index.discard(key)
+                expected.discard(key)
+        self.assertEqual(list(index.after()), sorted(expected))
+        self.assertEqual(list(index.after(150)), sorted(key for key in expected if key > 150))
+        self.assertEqual(list(index.after(300)), [])
+
+    def test_iter_sessions_order(self):
+        storage = MemorySessionStorage()
+        sessionIds = [secrets.token_urlsafe() for _ in range(50)] + ['plain.id', 'other.id']
+        for sessionId in sessionIds:
+            storage.store_session(sessionId, 'OrderUser')
+        storage.remove_session(sessionIds[0])
+        listed = [sessionId for sessionId, _ in storage.iter_sessions()]
+        self.assertEqual(sorted(listed), sorted(sessionIds[1:]))
+        self.assertEqual([sessionId for sessionId, _ in storage.iter_sessions(listed[9])], listed[10:])
+        self.assertEqual(listed[-2:], ['other.id', 'plain.id'])
+
+    def test_sessions(self):
+        storage = MemorySessionStorage()
+        sessionIds = [secrets.token_urlsafe() for _ in range(5)] + ['not-a-token!']
+        for sessionId in sessionIds:
+            storage.store_session(sessionId, 'MemoryUser')
+            storage.add_user_session('MemoryUser', sessionId)
+        self.assertTrue(all(isinstance(key, bytes) for key in list(storage._sessions)[:5]))
+        self.assertEqual(storage.find_session(sessionIds[0]), 'MemoryUser')
+        self.assertEqual(storage.find_session('not-a-token!'), 'MemoryUser')
+        self.assertEqual(sorted(storage.find_user_sessions('MemoryUser')), sorted(sessionIds))
+
+        listed = [sessionId for sessionId, _ in storage.iter_sessions()]
+        self.assertEqual(sorted(listed), sorted(sessionIds))
+        self.assertEqual([sessionId for sessionId, _ in storage.iter_sessions(listed[2])], listed[3:])
+
+        storage.remove_session(sessionIds[0])
+        self.assertIsNone(storage.find_session(sessionIds[0]))
+        self.assertEqual(storage.remove_user_sessions('MemoryUser'), 5)
+        self.assertEqual(list(storage.iter_sessions()), [])
+
+    def test_ttl(self):
+        storage = MemorySessionStorage(sessionTtl=0.05)
+        storage.store_session('first', 'TtlUser')
+        storage.store_session('second', 'TtlUser')
+        time.sleep(0.1)
+        self.assertIsNone(storage.find_session('first'))
+        self.assertEqual(storage.evict_expired(), 1)
+        self.assertEqual(list(storage.iter_sessions()), [])
+
+    def test_refresh_tokens(self):
+        storage = MemoryTokenStorage()
+        storage.store_refresh_token('TokenUser', 'token1', 'ab' * 32)
+        storage.store_refresh_token('TokenUser', 'token2', 'cd' * 32)
+        self.assertEqual(storage.find_refresh_token('ab' * 32), ('TokenUser', 'token1'))
+        self.assertEqual([hash for hash, _ in storage.iter_refresh_tokens()], ['ab' * 32, 'cd' * 32])
+        self.assertEqual(storage.remove_user_refresh_tokens('TokenUser'), 2)
+        self.assertIsNone(storage.find_refresh_token('cd' * 32))
+
+    def test_concurrent_users(self):
+        storage = MemorySessionStorage()
+
+        def store(i):
+            username = f'User{i % 10}'
+            storage.store_user(username, 'hash')
+            sessionId = secrets.token_urlsafe()
+            storage.store_session(sessionId, username)
+            storage.add_user_session(username, sessionId)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(store, range(1000)))
+        self.assertEqual(len(list(storage.iter_usernames())), 10)
+        self.assertEqual(sum(storage.remove_user_sessions(f'User{i}') for i in range(10)), 1000)
+
+    def test_app(self):
+        testClient = create_sb_app('sb_memory_app', storage=MemorySessionStorage()).test_client()
+        testUser = {'username': 'MemoryAppUser', 'password': 'MemoryAppUser1234!'}
+        self.assertEqual(testClient.post('/register', json=testUser).status_code, HTTPStatus.OK)
+        self.assertEqual(testClient.post('/register', json=testUser).status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(testClient.post('/login', json=testUser).status_code, HTTPStatus.OK)
+        self.assertEqual(testClient.post('/testing/resource').status_code, HTTPStatus.OK)
+        self.assertEqual(testClient.post('/logout/all').json['removed'], 1)
@@ -0,0 +1,70 @@
+from http import HTTPStatus
+import time
+import unittest
+
+from flask_authbp.resilience import CircuitBreaker, GuardedStorage
+from tests.utility import SbTestStorage, create_sb_app
+
+
+class FlakyStorage(SbTestStorage):
+    def __init__(self):
+        super().__init__()
+        self.delay = 0.0
+
+    def find_session(self, sessionId):
+        time.sleep(self.delay)
+        return super().find_session(sessionId)
+
+
+class TestGuardedStorage(unittest.TestCase):
+    def setUp(self):
+        self.storage = FlakyStorage()
+        self.guarded = GuardedStorage(
+            self.storage, timeout=0.05, breaker=CircuitBreaker(failureThreshold=2, resetTimeout=0.2),
+            staleCacheSize=10
+        )
+        self.app = create_sb_app('sb_guarded_app', storage=self.guarded)
+
+    def _login(self, testUser):
+        testClient = self.app.test_client()
+        testClient.post('/register', json=testUser)
+        self.assertEqual(testClient.post('/login', json=testUser).status_code, HTTPStatus.OK)
+        return testClient
+
+    def test_stale_identity_during_outage(self):
+        verifiedClient = self._login({'username': 'VerifiedUser', 'password': 'VerifiedUser1234!'})
+        newClient = self._login({'username': 'NewUser', 'password': 'NewUser1234!'})
+        self.assertEqual(verifiedClient.post('/testing/resource').status_code, HTTPStatus.OK)
+
+        self.storage.delay = 0.2
+        self.assertEqual(verifiedClient.post('/testing/resource').status_code, HTTPStatus.OK)
+        self.assertEqual(newClient.post('/testing/resource').status_code, HTTPStatus.SERVICE_UNAVAILABLE)
+        self.assertEqual(self.guarded.state, CircuitBreaker.OPEN)
+
+        start = time.perf_counter()
+        self.assertEqual(newClient.post('/testing/resource').status_code, HTTPStatus.SERVICE_UNAVAILABLE)
+        self.assertLess(time.perf_counter() - start, 0.05)
+        metrics = self.guarded.metrics()
+        self.assertEqual(metrics['timeouts'], 2)
+        self.assertGreaterEqual(metrics['rejected'], 1)
+        self.assertEqual(metrics['staleHits'], 1)
+
+        self.storage.delay = 0.0
+        time.sleep(0.2)
+        self.assertEqual(newClient.post('/testing/resource').status_code, HTTPStatus.OK)
+        self.assertEqual(self.guarded.state, CircuitBreaker.CLOSED)
+
+    def test_logout_invalidates_stale_identity(self):
+        testClient = self._login({'username': 'StaleLogoutUser', 'password': 'StaleLogoutUser1234!'})
+        self.assertEqual(testClient.post('/testing/resource').status_code, HTTPStatus.OK)
+        self.assertEqual(testClient.post('/logout').status_code, HTTPStatus.OK)
+        self.assertEqual(self.guarded.metrics()['staleEntries'], 0)
+
+    def test_revoked_session_not_served_stale(self):
+        testClient = self._login({'username': 'RevokedUser', 'password': 'RevokedUser1234!'})
+        self.assertEqual(testClient.post('/testing/resource').status_code, HTTPStatus.OK)
+        self.storage.remove_user_sessions('RevokedUser')
+        self.assertEqual(testClient.post('/testing/resource').status_code, HTTPStatus.FORBIDDEN)
+
+        self.storage.delay = 0.2
+        self.assertEqual(testClient.post('/testing/resource').status_code, HTTPStatus.SERVICE_UNAVAILABLE)
@@ -1,9 +1,31 @@
 from http import HTTPStatus
 import unittest
 
+from flask_authbp.sessionbased import Storage
 from tests.utility import create_sb_app
 
 
+class LegacyStorage(Storage):
+    def __init__(self):
+        self._passwordHashes = dict()
+        self._session = dict()
+
+    def find_password_hash(self, username):
+        return self._passwordHashes.get(username)
+
+    def store_user(self, username, passwordHash):
+        self._passwordHashes[username] = passwordHash
+
+    def find_session(self, sessionId):
+        return self._session.get(sessionId)
+
+    def store_session(self, sessionId, username):
+        self._session[sessionId] = username
+
+    def remove_session(self, sessionId):
+        self._session.pop(sessionId)
+
+
 class TestSessionBased(unittest.TestCase):
     def setUp(self):
         self.app = create_sb_app('sb_specific_testing_app')
@@ -33,3 +55,35 @@ class TestSessionBased(unittest.TestCase):
 
         afterLogoutResponse = testClient.post('/testing/resource', json=testData)
         self.assertEqual(afterLogoutResponse.status_code, HTTPStatus.FORBIDDEN)
+
+    def test_logout_everywhere(self):
+        testUser = {
+            'username': 'EverywhereUser',
+            'password': 'EverywhereUser1234!'
+        }
+        firstClient = self.app.test_client()
+        secondClient = self.app.test_client()
+        self.assertEqual(firstClient.post('/register', json=testUser).status_code, HTTPStatus.OK)
+        self.assertEqual(firstClient.post('/login', json=testUser).status_code, HTTPStatus.OK)
+        self.assertEqual(secondClient.post('/login', json=testUser).status_code, HTTPStatus.OK)
+        self.assertEqual(secondClient.post('/testing/resource').status_code, HTTPStatus.OK)
+
+        logoutResponse = firstClient.post('/logout/all')
+        self.assertEqual(logoutResponse.status_code, HTTPStatus.OK)
+        self.assertEqual(logoutResponse.json['removed'], 2)
+        self.assertEqual(firstClient.post('/testing/resource').status_code, HTTPStatus.FORBIDDEN)
+        self.assertEqual(secondClient.post('/testing/resource').status_code, HTTPStatus.FORBIDDEN)
+
+    def test_legacy_storage(self):
+        testClient = create_sb_app('sb_legacy_app', storage=LegacyStorage(), isAdmin=lambda user: True).test_client()
+        testUser = {
+            'username': 'LegacyUser',
+            'password': 'LegacyUser1234!'
+        }
+        self.assertEqual(testClient.post('/register', json=testUser).status_code, HTTPStatus.OK)
+        self.assertEqual(testClient.post('/login', json=testUser).status_code, HTTPStatus.OK)
+        self.assertEqual(testClient.post('/logout/all').status_code, HTTPStatus.NOT_FOUND)
+        self.assertEqual(testClient.get('/admin/sessions').status_code, HTTPStatus.NOT_FOUND)
+        self.assertEqual(testClient.post('/testing/resource').status_code, HTTPStatus.OK)
+        self.assertEqual(testClient.post('/logout').status_code, HTTPStatus.OK)
+        self.assertEqual(testClient.post('/testing/resource').status_code, HTTPStatus.FORBIDDEN)
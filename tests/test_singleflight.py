@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+import threading
+import time
+import unittest
+
+from flask import Flask
+from flask_login import UserMixin  # type: ignore
+
+from flask_authbp._utility import SingleFlight
+from flask_authbp.flask_login import add_authbp
+from flask_authbp.memory import MemoryFlaskLoginStorage
+from tests.utility import SbTestStorage, create_sb_app
+
+
+class SlowSessionStorage(SbTestStorage):
+    def __init__(self):
+        super().__init__()
+        self.sessionLookups = 0
+        self._lock = threading.Lock()
+
+    def find_session(self, sessionId):
+        with self._lock:
+            self.sessionLookups += 1
+        time.sleep(0.2)
+        return super().find_session(sessionId)
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_shared_result_and_error(self):
+        calls = []
+
+        def lookup(key):
+            calls.append(key)
+            time.sleep(0.1)
+            if key == 'broken':
+                raise KeyError(key)
+            return key.upper()
+
+        shared = SingleFlight(lookup)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(shared, ['a'] * 6 + ['b'] * 2))
+            errors = [executor.submit(shared, 'broken') for _ in range(4)]
+            for error in errors:
+                self.assertRaises(KeyError, error.result)
+        self.assertEqual(results, ['A'] * 6 + ['B'] * 2)
+        self.assertEqual(sorted(calls), ['a', 'b', 'broken'])
+        self.assertEqual(shared('a'), 'A')
+        self.assertEqual(len(calls), 4)
+
+    def test_concurrent_session_lookups(self):
+        storage = SlowSessionStorage()
+        app = create_sb_app('sb_single_flight_app', storage=storage)
+        storage.store_user('HerdUser', 'hash')
+        storage.store_session('HerdSession', 'HerdUser')
+
+        def request(_):
+            testClient = app.test_client()
+            with testClient.session_transaction() as session:
+                session['_id'] = 'HerdSession'
+            return testClient.post('/testing/resource').status_code
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            statuses = list(executor.map(request, range(8)))
+        self.assertEqual(statuses, [HTTPStatus.OK] * 8)
+        self.assertLess(storage.sessionLookups, 8)
+
+    def test_user_loader_coalescing_is_opt_in(self):
+        class User(UserMixin):
+            def __init__(self, username):
+                self.id = username
+
+        for threadSafeUsers in (False, True):
+            storage = MemoryFlaskLoginStorage(User)
+            storage.threadSafeUsers = threadSafeUsers
+            app = Flask(f'flask_login_coalescing_{threadSafeUsers}')
+            app.config['SECRET_KEY'] = 'my secret'
+            add_authbp(app, storage)
+            self.assertEqual(isinstance(app.login_manager._user_callback, SingleFlight), threadSafeUsers)
@@ -0,0 +1,75 @@
+import random
+import re
+import unittest
+
+from flask import request
+
+from flask_authbp.messages import LoginStatus, RegistrationStatus
+from flask_authbp.validation import name_valid, pass_valid
+from tests.utility import CountingStorage, create_sb_app
+
+
+NAME_REGEX = re.compile(r'^(?![_])(?!.*[_]{2})[a-zA-Z0-9._]+(?<![_])$')
+PASS_REGEX = re.compile(r'^(?=.*[\d])(?=.*[A-Z])(?=.*[a-z])[\w\d!@#$%_]{6,64}$')
+
+
+class TestValidators(unittest.TestCase):
+    def test_same_rules_as_regexes(self):
+        rng = random.Random(38)
+        alphabet = 'aZ09._!@#$%^ -é١ß\n'
+        for _ in range(20000):
+            candidate = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 70)))
+            if candidate.endswith('\n'):
+                continue
+            self.assertEqual(name_valid(candidate), bool(NAME_REGEX.search(candidate)), repr(candidate))
+            self.assertEqual(pass_valid(candidate), bool(PASS_REGEX.search(candidate)), repr(candidate))
+
+    def test_trailing_newline_rejected(self):
+        self.assertFalse(name_valid('ValidUser\n'))
+        self.assertFalse(pass_valid('Valid1234\n'))
+
+    def test_length_limits(self):
+        self.assertFalse(name_valid(''))
+        self.assertTrue(name_valid('a' * 128))
+        self.assertFalse(name_valid('a' * 129))
+        self.assertTrue(pass_valid('Aa1' * 21 + 'a'))
+        self.assertFalse(pass_valid('Aa1' * 22))
+
+
+class TestRequestValidation(unittest.TestCase):
+    def setUp(self):
+        self.storage = CountingStorage()
+        app = create_sb_app('sb_validation_app', storage=self.storage)
+        app.config['MAX_CREDENTIALS_BYTES'] = 256
+        self.testClient = app.test_client()
+
+    def test_oversized_payload(self):
+        oversized = {'username': 'ValidUser', 'password': 'Valid1234' + 'a' * 300}
+        for route in ('/register', '/login'):
+            response = self.testClient.post(route, json=oversized)
+            self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.storage.lookups, 0)
+
+    def test_malformed_payload(self):
+        for route in ('/register', '/login'):
+            for body in ('not json', '[]', '{"username": "ValidUser"}', '{"username": 1, "password": "Valid1234"}'):
+                response = self.testClient.post(route, data=body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json['message'], 'Input payload validation failed')
+        self.assertEqual(self.storage.lookups, 0)
+
+    def test_body_already_read(self):
+        app = create_sb_app('sb_validation_read_app')
+        app.before_request(lambda: request.get_json(silent=True) and None)
+        testClient = app.test_client()
+        testUser = {'username': 'ReadBodyUser', 'password': 'ReadBodyUser1234!'}
+        self.assertEqual(testClient.post('/register', json=testUser).status_code, 200)
+        self.assertEqual(testClient.post('/login', json=testUser).status_code, 200)
+
+    def test_rejected_before_storage(self):
+        response = self.testClient.post('/register', json={'username': '_Invalid', 'password': 'Valid1234'})
+        self.assertEqual(response.json['message'], RegistrationStatus.InvalidUsername)
+        response = self.testClient.post('/login', json={'username': 'a' * 129, 'password': 'Valid1234'})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json['message'], LoginStatus.WrongUsernameOrPassword)
+        self.assertEqual(self.storage.lookups, 0)
@@ -9,6 +9,7 @@ class SbTestStorage(flask_authbp.sessionbased.Storage):
     def __init__(self):
         self._passwordHashes = dict()
         self._session = dict()
+        self._userSessions = dict()
 
     def find_password_hash(self, username):
         return self._passwordHashes[username] if username in self._passwordHashes else None
@@ -20,6 +21,12 @@ class SbTestStorage(flask_authbp.sessionbased.Storage):
             self._passwordHashes[username] = passwordHash
             return True
 
+    def update_password_hash(self, username, passwordHash):
+        self._passwordHashes[username] = passwordHash
+
+    def iter_usernames(self, after=None):
+        return iter([username for username in sorted(self._passwordHashes) if after is None or username > after])
+
     def find_session(self, sessionId):
         return self._session[sessionId] if sessionId in self._session else None
 
@@ -29,8 +36,37 @@ class SbTestStorage(flask_authbp.sessionbased.Storage):
     def remove_session(self, sessionId):
         self._session.pop(sessionId)
 
+    def add_user_session(self, username, sessionId):
+        self._userSessions.setdefault(username, set()).add(sessionId)
+
+    def remove_user_session(self, username, sessionId):
+        self._userSessions.get(username, set()).discard(sessionId)
+
+    def find_user_sessions(self, username):
+        return list(self._userSessions.get(username, ()))
 
-def create_sb_app(title, urlScheme='https', accessExpSecs=15 * 60):
+    def iter_sessions(self, after=None):
+        return iter([item for item in sorted(self._session.items()) if after is None or item[0] > after])
+
+    def remove_user_sessions(self, username):
+        sessionIds = self._userSessions.pop(username, set())
+        for sessionId in sessionIds:
+            self._session.pop(sessionId, None)
+        return len(sessionIds)
+
+
+class CountingStorage(SbTestStorage):
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    def find_password_hash(self, username):
+        self.lookups += 1
+        return super().find_password_hash(username)
+
+
+def create_sb_app(title, urlScheme='https', accessExpSecs=15 * 60, storage=None, hashingPolicy=None,
+                  usernameFilter=None, audit=None, isAdmin=None):
     class TestingConfig(Config):
         DATABASE_URI = 'sqlite:///:memory:'
         TESTING = True
@@ -39,8 +75,10 @@ def create_sb_app(title, urlScheme='https', accessExpSecs=15 * 60):
         REFRESH_EXP_SECS = 30 * 24 * 60 * 60
         PREFERRED_URL_SCHEME = urlScheme
 
-    storage = SbTestStorage()
-    blueprint, permission_required = flask_authbp.sessionbased.create_blueprint(storage)
+    storage = storage or SbTestStorage()
+    blueprint, permission_required = flask_authbp.sessionbased.create_blueprint(
+        storage, hashingPolicy, usernameFilter, audit, isAdmin
+    )
     app = Flask(title)
     app.config.from_object(TestingConfig)
     app.register_blueprint(blueprint)
@@ -73,14 +111,29 @@ class TokenTestStorage(flask_authbp.tokenbased.Storage):
             self._passwordHashes[username] = passwordHash
             return True
 
+    def iter_usernames(self, after=None):
+        return iter([username for username in sorted(self._passwordHashes) if after is None or username > after])
+
     def find_refresh_token(self, userAgentHash):
         return self._refreshTokens[userAgentHash] if userAgentHash in self._refreshTokens else None
 
     def store_refresh_token(self, username, refreshTokenEncoded, userAgentHash):
         self._refreshTokens[userAgentHash] = (username, refreshTokenEncoded)
 
+    def iter_refresh_tokens(self, after=None):
+        return iter([
+            (userAgentHash, username) for userAgentHash, (username, _) in sorted(self._refreshTokens.items())
+            if after is None or userAgentHash > after
+        ])
+
+    def remove_user_refresh_tokens(self, username):
+        userAgentHashes = [key for key, (uid, _) in self._refreshTokens.items() if uid == username]
+        for userAgentHash in userAgentHashes:
+            self._refreshTokens.pop(userAgentHash)
+        return len(userAgentHashes)
+
 
-def create_jwt_app(title, urlScheme='https', accessExpSecs=15 * 60):
+def create_jwt_app(title, urlScheme='https', accessExpSecs=15 * 60, tokenCodec='jwt'):
     class TestingConfig(Config):
         DATABASE_URI = 'sqlite:///:memory:'
         TESTING = True
@@ -88,6 +141,8 @@ def create_jwt_app(title, urlScheme='https', accessExpSecs=15 * 60):
         ACCESS_EXP_SECS = accessExpSecs
         REFRESH_EXP_SECS = 30 * 24 * 60 * 60
         PREFERRED_URL_SCHEME = urlScheme
+        INTROSPECTION_KEY = 'gateway key'
+        TOKEN_CODEC = tokenCodec
 
     storage = TokenTestStorage()
     blueprint, permission_required = flask_authbp.tokenbased.create_blueprint(storage)